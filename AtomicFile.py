@@ -0,0 +1,83 @@
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import os
+import tempfile
+import time
+
+
+@contextmanager
+def atomic_open(path, mode="w", encoding=None, fsync=False):
+    """Open a unique temp file next to path; on success it is renamed over path.
+
+    The temp name comes from tempfile.mkstemp, so two processes saving the
+    same file at once never write into each other's temp file; the last
+    rename wins and readers only ever see a complete file. On error the temp
+    file is removed and path is left untouched. The permissions of the file
+    being replaced are kept (0644 for new files). fsync=True flushes the
+    data to disk before the rename.
+
+        with atomic_open(folder / "stats.json") as f:
+            json.dump(data, f)
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        # mkstemp creates 0600 files; keep the permissions of the file we replace
+        try:
+            file_mode = path.stat().st_mode & 0o777
+        except FileNotFoundError:
+            file_mode = 0o644
+        os.chmod(tmp_path, file_mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_json(path, data, fsync=False, **dump_options):
+    """json.dump data to path atomically (see atomic_open)."""
+    with atomic_open(path, fsync=fsync) as f:
+        json.dump(data, f, **dump_options)
+
+
+@contextmanager
+def file_lock(lock_path, timeout=30.0, stale_after=300.0):
+    """Cross-process lock based on exclusive creation of lock_path.
+
+    Works on Windows and POSIX alike. A lock file older than stale_after
+    seconds is assumed to belong to a crashed process and is taken over.
+    """
+    lock_path = Path(lock_path)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - lock_path.stat().st_mtime > stale_after:
+                    lock_path.unlink()
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for lock {lock_path}")
+            time.sleep(0.01)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        yield
+    finally:
+        os.close(fd)
+        try:
+            lock_path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,112 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import hashlib
+import multiprocessing
+import os
+import shutil
+
+from AtomicFile import atomic_open
+from Manifest import file_digest
+
+CHECKSUM_CHUNK = 1024 * 1024
+VERIFY_MODES = ("record", "full")
+
+
+class ChecksumMismatch(OSError):
+    """A placed file doesn't hash to its source's digest (the source is kept)."""
+
+
+class HashingCopy:
+    """copy_function that hashes the source while copying it.
+
+    Each byte is read once and both written and fed to BLAKE2b (same
+    digest as Manifest.file_digest), so the source checksum costs no
+    second read. Digests are kept in self.digests by source path; each
+    call returns ('copied', bytes copied).
+    """
+
+    def __init__(self, chunk_size=CHECKSUM_CHUNK):
+        self.chunk_size = chunk_size
+        self.digests = {}
+
+    def __call__(self, source, destination):
+        h = hashlib.blake2b(digest_size=32)
+        buf = bytearray(self.chunk_size)
+        view = memoryview(buf)
+        copied = 0
+        with open(source, "rb") as fsrc, open(destination, "wb") as fdst:
+            while True:
+                n = fsrc.readinto(buf)
+                if not n:
+                    break
+                h.update(view[:n])
+                fdst.write(view[:n])
+                copied += n
+        shutil.copystat(source, destination)
+        self.digests[str(source)] = h.hexdigest()
+        return "copied", copied
+
+
+def _digest_or_none(path):
+    try:
+        return file_digest(path, CHECKSUM_CHUNK)
+    except OSError:
+        return None
+
+
+def hash_files(paths, workers=None):
+    """BLAKE2b digests of paths (None for unreadable files), hashed in a process pool."""
+    paths = [str(p) for p in paths]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 2:
+        return [_digest_or_none(p) for p in paths]
+    # organize runs often live in threads (GUI, batch jobs); don't fork those
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths)), mp_context=context) as pool:
+        return list(pool.map(_digest_or_none, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+
+class ChecksumManifest:
+    """Per-pass checksum list in b2sum format.
+
+    Stored as '.organizer_checksums.b2sum' inside the pass folder, one
+    '<blake2b-256 hex>  <Category/name>' line per file, so it can also be
+    checked outside the tool with `b2sum -l 256 -c`.
+    """
+
+    FILENAME = ".organizer_checksums.b2sum"
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self.path = self.folder / self.FILENAME
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        digest, sep, rel = line.rstrip("\n").partition("  ")
+                        if sep:
+                            self.entries[rel] = digest
+            except OSError as e:
+                print(f"Ignoring unreadable checksum manifest '{self.path}': {e}")
+
+    def record(self, rel_path, digest):
+        self.entries[rel_path] = digest
+
+    def save(self):
+        with atomic_open(self.path, encoding="utf-8") as f:
+            for rel in sorted(self.entries):
+                f.write(f"{self.entries[rel]}  {rel}\n")
+
+    def verify(self, workers=None):
+        """Re-hash every listed file; returns {'checked', 'mismatched', 'missing'}."""
+        rels = sorted(self.entries)
+        digests = hash_files([self.folder / rel for rel in rels], workers)
+        mismatched, missing = [], []
+        for rel, digest in zip(rels, digests):
+            if digest is None:
+                missing.append(rel)
+            elif digest != self.entries[rel]:
+                mismatched.append(rel)
+        return {"checked": len(rels), "mismatched": mismatched, "missing": missing}
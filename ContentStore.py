@@ -0,0 +1,119 @@
+from pathlib import Path
+import os
+import shutil
+import sys
+import threading
+import uuid
+
+from Checksums import ChecksumMismatch
+from Manifest import file_digest
+
+# ioctl number for FICLONE on Linux (btrfs, XFS with reflink=1, ...)
+FICLONE = 0x40049409
+
+
+class ContentStore:
+    """Content-addressed blob store used to deduplicate subject passes.
+
+    Every placed file is hashed (streaming BLAKE2b) and stored once under
+    '<root>/<first two hex chars>/<digest>'. The destination then gets a
+    reflink of the blob where the filesystem supports it, otherwise a
+    hardlink, otherwise a plain copy. Hardlinked files share their bytes
+    with every other pass that holds the same content, so they must be
+    replaced rather than edited in place.
+
+    The store must live on the same filesystem as the passes for links to
+    work; for_subject() puts it next to the subject folders.
+    """
+
+    DIRNAME = ".content_store"
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {"reflinked": 0, "hardlinked": 0, "copied": 0, "stored_bytes": 0, "saved_bytes": 0}
+        # source -> digest of what place() stored, and the sources whose
+        # placed copy was re-hashed and matched before the source was removed
+        self.digests = {}
+        self.checked = set()
+
+    @classmethod
+    def for_subject(cls, subject):
+        return cls(subject.destination_root / cls.DIRNAME / subject.profile.name)
+
+    def blob_path(self, digest):
+        return self.root / digest[:2] / digest
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    @staticmethod
+    def _reflink(src, dst):
+        if not sys.platform.startswith("linux"):
+            return False
+        import fcntl
+        try:
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            try:
+                os.unlink(dst)
+            except OSError:
+                pass
+            return False
+        shutil.copystat(src, dst)
+        return True
+
+    def add(self, source):
+        """Store source if its content is new; return (digest, blob path)."""
+        digest = file_digest(source)
+        blob = self.blob_path(digest)
+        size = os.path.getsize(source)
+        if blob.exists():
+            self._count("saved_bytes", size)
+            return digest, blob
+        blob.parent.mkdir(exist_ok=True)
+        tmp = blob.with_name(f"{digest}.{uuid.uuid4().hex}.tmp")
+        if not self._reflink(source, tmp):
+            shutil.copy2(source, tmp)
+        # concurrent writers of the same content race harmlessly here
+        os.replace(tmp, blob)
+        self._count("stored_bytes", size)
+        return digest, blob
+
+    def place(self, source, destination, remove_source=False, verify=False):
+        """Put source's content at destination via the store; return the method used.
+
+        With remove_source and verify, the placed file is re-hashed and the
+        source is only removed when it matches the source's digest.
+        """
+        digest, blob = self.add(source)
+        self.digests[str(source)] = digest
+        destination = Path(destination)
+        tmp = destination.with_name(f".{destination.name}.{uuid.uuid4().hex}.tmp")
+        if self._reflink(blob, tmp):
+            method = "reflinked"
+        else:
+            try:
+                os.link(blob, tmp)
+                method = "hardlinked"
+            except OSError:
+                shutil.copy2(blob, tmp)
+                method = "copied"
+        os.replace(tmp, destination)
+        self._count(method)
+        if remove_source:
+            if verify:
+                if file_digest(destination) != digest:
+                    os.remove(destination)
+                    raise ChecksumMismatch("checksum mismatch after placing from the content store; source kept")
+                self.checked.add(str(source))
+            os.remove(source)
+        return method
+
+    def summary(self):
+        s = self.stats
+        return (f"{s['reflinked']} reflinked, {s['hardlinked']} hardlinked, {s['copied']} copied; "
+                f"{s['stored_bytes'] / 1e6:.1f} MB stored, {s['saved_bytes'] / 1e6:.1f} MB deduplicated")
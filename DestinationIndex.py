@@ -0,0 +1,109 @@
+import os
+
+COLLISION_POLICIES = ("overwrite", "skip", "rename", "keep-newer")
+
+
+class DestinationIndex:
+    """In-memory index of the names in a pass folder's category folders.
+
+    Each category folder is listed once, with a single os.scandir, the first
+    time a file is routed to it; after that, conflict checks are set lookups
+    rather than a stat per file. Names claimed during the run are added as
+    they are handed out, so two sources with the same name are detected too.
+
+    Policies:
+      overwrite   replace the existing file (the historical behaviour)
+      skip        leave the existing file, don't transfer
+      rename      place the new file as 'name_copy1.ext', 'name_copy2.ext', ...
+                  (not 'name_1.ext', which would read as frame 1 of a sequence)
+      keep-newer  replace only if the source is newer (mtime) than what is there
+    """
+
+    def __init__(self, root, policy="overwrite"):
+        if policy not in COLLISION_POLICIES:
+            raise ValueError(f"Unknown collision policy '{policy}', expected one of {', '.join(COLLISION_POLICIES)}")
+        self.root = root
+        self.policy = policy
+        self._names = {}
+        # mtimes/sizes of files placed during this run
+        self._claimed_mtimes = {}
+        self._claimed_sizes = {}
+        # next free suffix per (category, stem, ext) so renames stay O(1)
+        self._next_suffix = {}
+        self.counts = {"overwritten": 0, "skipped": 0, "renamed": 0}
+        self.last_replaced = None
+
+    def names(self, category):
+        names = self._names.get(category)
+        if names is None:
+            try:
+                with os.scandir(os.path.join(self.root, category)) as it:
+                    names = {entry.name for entry in it}
+            except OSError:
+                names = set()
+            self._names[category] = names
+        return names
+
+    def _mtime_ns(self, category, name):
+        mtime = self._claimed_mtimes.get((category, name))
+        if mtime is None:
+            try:
+                mtime = os.stat(os.path.join(self.root, category, name)).st_mtime_ns
+            except OSError:
+                mtime = 0
+        return mtime
+
+    def _free_name(self, category, name, names):
+        dot = name.find(".", 1)
+        stem, ext = (name[:dot], name[dot:]) if dot > 0 else (name, "")
+        key = (category, stem, ext)
+        n = self._next_suffix.get(key, 1)
+        while f"{stem}_copy{n}{ext}" in names:
+            n += 1
+        self._next_suffix[key] = n + 1
+        return f"{stem}_copy{n}{ext}"
+
+    def _existing_size(self, category, name):
+        size = self._claimed_sizes.get((category, name))
+        if size is None:
+            try:
+                size = os.stat(os.path.join(self.root, category, name)).st_size
+            except OSError:
+                size = 0
+        return size
+
+    def resolve(self, category, name, source_mtime_ns=None, policy=None, size=None):
+        """Name to write the file under in category, or None to skip it.
+
+        After the call, last_replaced holds the size of the file the write
+        will replace, or None when the name was free.
+        """
+        policy = policy or self.policy
+        names = self.names(category)
+        self.last_replaced = None
+        if name in names:
+            if policy == "skip":
+                self.counts["skipped"] += 1
+                return None
+            if policy == "rename":
+                name = self._free_name(category, name, names)
+                self.counts["renamed"] += 1
+            elif policy == "keep-newer":
+                if source_mtime_ns is None or source_mtime_ns <= self._mtime_ns(category, name):
+                    self.counts["skipped"] += 1
+                    return None
+                self.counts["overwritten"] += 1
+                self.last_replaced = self._existing_size(category, name)
+            else:
+                self.counts["overwritten"] += 1
+                self.last_replaced = self._existing_size(category, name)
+        names.add(name)
+        if source_mtime_ns is not None:
+            self._claimed_mtimes[(category, name)] = source_mtime_ns
+        if size is not None:
+            self._claimed_sizes[(category, name)] = size
+        return name
+
+    def summary(self):
+        c = self.counts
+        return f"{c['overwritten']} overwritten, {c['renamed']} renamed, {c['skipped']} skipped"
@@ -0,0 +1,198 @@
+from pathlib import Path
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from PipelineOrganizer import PipelineOrganizer
+
+
+def device_of(path):
+    """(st_dev, mount point) of the nearest existing ancestor of path."""
+    path = Path(path).absolute()
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    dev = os.stat(path).st_dev
+    mount = path
+    while not os.path.ismount(mount) and mount != mount.parent:
+        mount = mount.parent
+    return dev, str(mount)
+
+
+class IngestJob:
+    """One scheduled unit of work and, after it ran, its outcome."""
+
+    __slots__ = ("name", "task", "priority", "device", "mount", "queued_at", "started_at",
+                 "finished_at", "result", "error")
+
+    def __init__(self, name, task, priority, device, mount):
+        self.name = name
+        self.task = task
+        self.priority = priority
+        self.device = device
+        self.mount = mount
+        self.queued_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.error is None and bool(self.result and self.result.get("ok"))
+
+    def to_dict(self):
+        result = self.result or {}
+        return {
+            "name": self.name,
+            "priority": self.priority,
+            "mount": self.mount,
+            "ok": self.ok,
+            "files": result.get("copied", 0),
+            "bytes": result.get("bytes", 0),
+            "waited": round((self.started_at or self.queued_at) - self.queued_at, 3),
+            "seconds": round((self.finished_at or 0) - (self.started_at or 0), 3) if self.finished_at else 0.0,
+            "error": self.error,
+        }
+
+
+class IngestScheduler:
+    """Runs many organize jobs concurrently with per-destination-device caps.
+
+    At most max_workers jobs run at once, and at most per_device of them
+    write to the same destination device (st_dev of the destination root),
+    so a slow NAS only ties up its own slots and local disks keep going.
+    device_limits overrides the cap for specific mounts/paths, e.g.
+    {'/mnt/nas': 1}. Among the jobs whose device has a free slot, the one
+    with the highest priority (then the oldest) starts next.
+
+    Jobs are either organize runs added with add() or any callable
+    returning a result dict (with 'ok' and optionally 'copied'/'bytes')
+    added with submit(). run() blocks until all jobs are done and returns
+    their IngestJob records; stats() aggregates them.
+    """
+
+    def __init__(self, max_workers=4, per_device=2, device_limits=None):
+        self.max_workers = max(1, max_workers)
+        self.per_device = max(1, per_device)
+        self.device_limits = {}
+        for path, limit in (device_limits or {}).items():
+            self.device_limits[device_of(path)[0]] = max(1, limit)
+        self.jobs = []
+        self._queue = []
+        self._order = itertools.count()
+        self._running = {}
+        self._peak = {}
+        self._cond = threading.Condition()
+        self._started = self._finished = None
+
+    def submit(self, task, destination, priority=0, name=None):
+        """Queue a callable that writes under destination; returns its IngestJob."""
+        try:
+            device, mount = device_of(destination) if destination is not None else (None, "unknown")
+        except OSError:
+            device, mount = None, "unknown"
+        job = IngestJob(name or f"job{len(self.jobs) + 1}", task, priority, device, mount)
+        with self._cond:
+            self.jobs.append(job)
+            heapq.heappush(self._queue, (-priority, next(self._order), job))
+            self._cond.notify()
+        return job
+
+    def add(self, source, subject, priority=0, name=None, **options):
+        """Queue organize_to_subject(source, subject, **options) with its own PipelineOrganizer."""
+
+        def task():
+            organizer = PipelineOrganizer(subject.profile)
+            ok = organizer.organize_to_subject(source, subject, **options)
+            done = [r for r in organizer.last_results if r.ok]
+            return {"ok": ok and len(done) == len(organizer.last_results), "copied": len(done),
+                    "bytes": sum(r.size for r in done),
+                    "failed": [{"source": str(r.source), "error": str(r.error)}
+                               for r in organizer.last_results if not r.ok]}
+
+        return self.submit(task, subject.destination_root, priority, name or f"{source} -> {subject.name}")
+
+    def _limit(self, device):
+        return self.device_limits.get(device, self.per_device)
+
+    def _next_job(self):
+        """Pop the best queued job whose device has a free slot (caller holds the lock)."""
+        skipped = []
+        job = None
+        while self._queue:
+            entry = heapq.heappop(self._queue)
+            candidate = entry[2]
+            if self._running.get(candidate.device, 0) < self._limit(candidate.device):
+                job = candidate
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._queue, entry)
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._queue:
+                        return
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    # every queued job's device is full; wait for a job to finish
+                    self._cond.wait()
+                running = self._running[job.device] = self._running.get(job.device, 0) + 1
+                self._peak[job.mount] = max(self._peak.get(job.mount, 0), running)
+            job.started_at = time.perf_counter()
+            try:
+                job.result = job.task()
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+            job.finished_at = time.perf_counter()
+            with self._cond:
+                self._running[job.device] -= 1
+                self._cond.notify_all()
+
+    def run(self):
+        self._started = time.perf_counter()
+        threads = [threading.Thread(target=self._worker, daemon=True)
+                   for _ in range(min(self.max_workers, max(1, len(self._queue))))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self._finished = time.perf_counter()
+        return self.jobs
+
+    def stats(self):
+        """Aggregate totals, overall and per destination mount."""
+        wall = (self._finished or time.perf_counter()) - (self._started or time.perf_counter())
+        devices = {}
+        total = {"jobs": 0, "ok": 0, "failed": 0, "files": 0, "bytes": 0}
+        for job in self.jobs:
+            data = job.to_dict()
+            dev = devices.setdefault(job.mount, {"jobs": 0, "files": 0, "bytes": 0, "busy_seconds": 0.0,
+                                                 "peak_concurrency": self._peak.get(job.mount, 0)})
+            dev["jobs"] += 1
+            dev["files"] += data["files"]
+            dev["bytes"] += data["bytes"]
+            dev["busy_seconds"] = round(dev["busy_seconds"] + data["seconds"], 3)
+            total["jobs"] += 1
+            total["ok" if job.ok else "failed"] += 1
+            total["files"] += data["files"]
+            total["bytes"] += data["bytes"]
+        total["seconds"] = round(wall, 3)
+        total["mb_per_second"] = round(total["bytes"] / 1e6 / wall, 1) if wall > 0 else 0.0
+        total["devices"] = devices
+        return total
+
+    def describe(self):
+        s = self.stats()
+        lines = [f"Ingest: {s['jobs']} jobs ({s['ok']} ok, {s['failed']} failed), {s['files']} files, "
+                 f"{s['bytes'] / 1e6:.1f} MB in {s['seconds']:.1f}s ({s['mb_per_second']} MB/s)"]
+        for mount, dev in s["devices"].items():
+            lines.append(f"  • {mount}: {dev['jobs']} jobs, {dev['files']} files, {dev['bytes'] / 1e6:.1f} MB, "
+                         f"peak {dev['peak_concurrency']} at once")
+        return "\n".join(lines)
@@ -0,0 +1,154 @@
+from pathlib import Path
+import json
+import os
+import threading
+
+# how many 'done' records may sit in the OS page cache before an fsync
+SYNC_EVERY = 256
+
+
+def temp_name(name):
+    """Name a file is copied to before it is atomically renamed into place."""
+    return f".{name}.part"
+
+
+class JobJournal:
+    """Write-ahead journal of one organize job, for resuming after a crash.
+
+    Stored as '.organizer_journal.jsonl' inside the pass folder, one JSON
+    record per line, appended as the job runs:
+
+        {"op": "job", "source": ..., "options": {...}}          the job itself
+        {"op": "copy", "src": ..., "dst": "Cat/name"}           file in flight
+        {"op": "done", "src": ...}                              file in place
+        {"op": "failed", "src": ..., "error": ...}              file failed
+
+    A 'copy' record is written before the transfer starts; the file is
+    copied to temp_name(name) next to its destination and only renamed to
+    its real name once complete, so a destination never holds a partial
+    file. Files the job had not reached yet are still planned by the job
+    record: resuming rescans the source with the same options. The journal
+    is deleted when a job finishes cleanly.
+    """
+
+    FILENAME = ".organizer_journal.jsonl"
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self.path = self.folder / self.FILENAME
+        self._file = None
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        # filled by replay(): sources already in place are skipped on resume
+        self.job = None
+        self.completed = set()
+        self.in_flight = {}
+
+    def exists(self):
+        return self.path.exists()
+
+    def _write(self, record, sync=False):
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            # flushed to the OS on every record: survives a killed process
+            self._file.flush()
+            self._unsynced += 1
+            if sync or self._unsynced >= SYNC_EVERY:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def start(self, source, options):
+        """Begin a new journal (truncating any old one) with the job record."""
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "w")
+        self._write({"op": "job", "source": str(source), "options": options}, sync=True)
+
+    def reopen(self):
+        """Keep appending to an existing journal (used when resuming)."""
+        self._file = open(self.path, "a")
+
+    def copying(self, source, rel_path):
+        self._write({"op": "copy", "src": str(source), "dst": rel_path})
+
+    def done(self, source):
+        self._write({"op": "done", "src": str(source)})
+
+    def failed(self, source, error):
+        self._write({"op": "failed", "src": str(source), "error": str(error)})
+
+    def close(self, remove=False):
+        if self._file is not None:
+            with self._lock:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+        if remove:
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def replay(self):
+        """Return (job record, completed sources, {source: rel_path} still in flight).
+
+        A torn last line (the process died mid-write) is ignored.
+        """
+        job = None
+        completed = set()
+        in_flight = {}
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                op = record.get("op")
+                if op == "job":
+                    job = record
+                elif op == "copy":
+                    in_flight[record["src"]] = record["dst"]
+                elif op == "done":
+                    completed.add(record["src"])
+                    in_flight.pop(record["src"], None)
+                elif op == "failed":
+                    in_flight.pop(record["src"], None)
+        self.job, self.completed, self.in_flight = job, completed, in_flight
+        return job, completed, in_flight
+
+    def recover(self):
+        """Clean up after a crash; returns (partials removed, files finished).
+
+        A temp file may be partial and is deleted (the file is copied again),
+        except in a move job whose source is already gone: the temp file is
+        then the only copy left, so it is renamed into place.
+        A destination that already matches its source (the rename happened
+        but its 'done' record was lost) counts as completed.
+        """
+        removed = finished = 0
+        completed = self.completed
+        moving = bool(self.job and self.job["options"].get("move"))
+        for source, rel_path in self.in_flight.items():
+            destination = self.folder / rel_path
+            tmp = destination.with_name(temp_name(destination.name))
+            source_exists = os.path.exists(source)
+            if tmp.exists():
+                if source_exists or not moving:
+                    tmp.unlink()
+                    removed += 1
+                    continue
+                os.replace(tmp, destination)
+                finished += 1
+                completed.add(source)
+                continue
+            if not source_exists:
+                continue
+            try:
+                src_stat, dst_stat = os.stat(source), os.stat(destination)
+            except FileNotFoundError:
+                continue
+            if src_stat.st_size == dst_stat.st_size and src_stat.st_mtime_ns == dst_stat.st_mtime_ns:
+                completed.add(source)
+                finished += 1
+        self.in_flight = {}
+        return removed, finished
@@ -0,0 +1,93 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+
+from AtomicFile import write_json
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Streaming BLAKE2b hex digest of a file."""
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class SubjectManifest:
+    """Per-pass record of what organize runs have already placed.
+
+    Stored as '.organizer_manifest.json' inside the subject's pass folder.
+    Entries are keyed by the destination path relative to that folder and
+    remember the source size/mtime (and optionally a content hash) so a
+    re-run can skip unchanged files without touching the destination.
+    """
+
+    FILENAME = ".organizer_manifest.json"
+
+    def __init__(self, folder):
+        self.path = Path(folder) / self.FILENAME
+        self.entries = {}
+        self.last_run = {}
+        self._by_source = None
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                self.entries = data.get("entries", {})
+                self.last_run = data.get("last_run", {})
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable manifest '{self.path}': {e}")
+
+    def check(self, rel_path, source, stat, destination, use_hash=False, existing=None):
+        """Return 'skip', 'updated' or 'new' for a source file bound for rel_path.
+
+        A recorded entry with the same size and mtime is trusted without
+        statting the destination, as long as the destination's name is in
+        existing (the names already listed in its folder, e.g.
+        DestinationIndex.names()); a file deleted since is placed again.
+        Otherwise the destination is compared by size+mtime, or by content
+        hash when use_hash is set.
+        """
+        entry = self.entries.get(rel_path)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            if existing is None or os.path.basename(destination) in existing:
+                return "skip"
+        try:
+            dest_stat = os.stat(destination)
+        except FileNotFoundError:
+            return "new"
+        if dest_stat.st_size != stat.st_size:
+            return "updated"
+        if use_hash:
+            dest_digest = entry.get("hash") if entry else None
+            digest = file_digest(source)
+            if digest == (dest_digest or file_digest(destination)):
+                self.record(rel_path, source, stat, digest)
+                return "skip"
+        elif dest_stat.st_mtime_ns == stat.st_mtime_ns:
+            self.record(rel_path, source, stat)
+            return "skip"
+        return "updated"
+
+    def placed_at(self, source):
+        """Relative path an earlier run placed source at (it may have been renamed), or None."""
+        if self._by_source is None:
+            self._by_source = {entry["source"]: rel for rel, entry in self.entries.items()}
+        return self._by_source.get(str(source))
+
+    def record(self, rel_path, source, stat, digest=None):
+        entry = {"source": str(source), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if digest:
+            entry["hash"] = digest
+        self.entries[rel_path] = entry
+        if self._by_source is not None:
+            self._by_source[str(source)] = rel_path
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_json(self.path, {"entries": self.entries, "last_run": self.last_run})
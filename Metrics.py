@@ -0,0 +1,219 @@
+from contextlib import contextmanager, nullcontext
+import heapq
+import itertools
+import json
+import time
+
+# slowest transfers kept per run
+SLOWEST_FILES = 10
+
+
+class RunMetrics:
+    """Timers and counters for one organize run.
+
+    Phases are timed exclusively: when a timed block runs inside another
+    (a scan generator pulled by the transfer loop), its time is counted
+    once, under the inner phase. Timing happens on the calling thread,
+    which also drives the scan generators; per-file copy times come from
+    the TransferResults measured by the workers.
+    """
+
+    enabled = True
+
+    def __init__(self, slowest=SLOWEST_FILES):
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.phases = {}
+        self.counters = {}
+        self.categories = {}
+        self.slowest_limit = slowest
+        self._slowest = []
+        self._order = itertools.count()
+        self._stack = []
+
+    def start(self):
+        """Open a timed block; pass the returned mark to stop()."""
+        self._stack.append(0.0)
+        return time.perf_counter()
+
+    def stop(self, name, start):
+        elapsed = time.perf_counter() - start
+        nested = self._stack.pop()
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed - nested
+        if self._stack:
+            self._stack[-1] += elapsed
+
+    @contextmanager
+    def phase(self, name):
+        start = self.start()
+        try:
+            yield
+        finally:
+            self.stop(name, start)
+
+    def timed_iter(self, name, iterable):
+        """Yield from iterable, charging the time spent producing items to phase name."""
+        it = iter(iterable)
+        while True:
+            start = self.start()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                self.stop(name, start)
+            yield item
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def file(self, result):
+        """Record one TransferResult."""
+        if not result.ok:
+            self.count("failed")
+            return
+        self.count("files")
+        self.count("bytes", result.size)
+        totals = self.categories.get(result.category)
+        if totals is None:
+            totals = self.categories[result.category] = {"files": 0, "bytes": 0, "seconds": 0.0}
+        totals["files"] += 1
+        totals["bytes"] += result.size
+        totals["seconds"] += result.seconds
+        entry = (result.seconds, next(self._order), str(result.source), result.size)
+        if len(self._slowest) < self.slowest_limit:
+            heapq.heappush(self._slowest, entry)
+        elif entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def report(self, **info):
+        return RunReport(self, time.perf_counter() - self._t0, info)
+
+
+class _NullMetrics:
+    """Stand-in used when instrumentation is off: every hook is a no-op."""
+
+    enabled = False
+    _context = nullcontext()
+
+    def start(self):
+        return None
+
+    def stop(self, name, start):
+        pass
+
+    def phase(self, name):
+        return self._context
+
+    def timed_iter(self, name, iterable):
+        return iterable
+
+    def count(self, name, n=1):
+        pass
+
+    def file(self, result):
+        pass
+
+
+NULL_METRICS = _NullMetrics()
+
+
+def _rate(nbytes, seconds):
+    return nbytes / seconds if seconds > 0 else 0.0
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RunReport:
+    """What a RunMetrics measured, as plain data plus JSON/Prometheus export."""
+
+    def __init__(self, metrics, seconds, info):
+        self.info = info
+        self.started = metrics.started
+        self.seconds = seconds
+        self.phases = dict(metrics.phases)
+        self.counters = dict(metrics.counters)
+        self.categories = {
+            category: dict(totals, bytes_per_second=_rate(totals["bytes"], totals["seconds"]))
+            for category, totals in metrics.categories.items()
+        }
+        self.slowest = [{"source": source, "seconds": seconds, "bytes": size}
+                        for seconds, _, source, size in sorted(metrics._slowest, reverse=True)]
+
+    def to_dict(self):
+        return {
+            **self.info,
+            "started": self.started,
+            "seconds": self.seconds,
+            "phases": self.phases,
+            "counters": self.counters,
+            "categories": self.categories,
+            "slowest": self.slowest,
+        }
+
+    def describe(self):
+        files, nbytes = self.counters.get("files", 0), self.counters.get("bytes", 0)
+        lines = [f"Run: {files} files, {nbytes / 1e6:.1f} MB in {self.seconds:.2f}s "
+                 f"({_rate(nbytes, self.seconds) / 1e6:.1f} MB/s)"]
+        lines.append("  Phases: " + ", ".join(f"{name} {secs:.3f}s" for name, secs in
+                                              sorted(self.phases.items(), key=lambda kv: -kv[1])))
+        for category, totals in sorted(self.categories.items()):
+            lines.append(f"  • {category}: {totals['files']} files, {totals['bytes'] / 1e6:.1f} MB, "
+                         f"{totals['bytes_per_second'] / 1e6:.1f} MB/s per transfer")
+        if self.slowest:
+            worst = self.slowest[0]
+            lines.append(f"  Slowest: {worst['source']} ({worst['seconds']:.3f}s, {worst['bytes'] / 1e6:.1f} MB)")
+        return "\n".join(lines)
+
+    def samples(self):
+        """(metric, help, labels, value) tuples for the Prometheus export."""
+        base = {k: v for k, v in self.info.items() if isinstance(v, str)}
+        yield "organizer_run_seconds", "Wall time of the organize run.", base, self.seconds
+        for name, secs in self.phases.items():
+            yield "organizer_phase_seconds", "Time spent per organize phase.", dict(base, phase=name), secs
+        for name, value in self.counters.items():
+            yield f"organizer_{name}_total", f"Organize run counter '{name}'.", base, value
+        for category, totals in self.categories.items():
+            labels = dict(base, category=category)
+            yield "organizer_category_files", "Files placed per category.", labels, totals["files"]
+            yield "organizer_category_bytes", "Bytes placed per category.", labels, totals["bytes"]
+            yield ("organizer_category_bytes_per_second", "Per-transfer throughput per category.",
+                   labels, totals["bytes_per_second"])
+
+    def write(self, path):
+        """Write the report as Prometheus text if path ends in '.prom', JSON otherwise."""
+        path = str(path)
+        with open(path, "w") as f:
+            if path.endswith(".prom"):
+                f.write(prometheus_text([self]))
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+
+
+def prometheus_text(reports):
+    """Prometheus text exposition of several reports, one HELP/TYPE block per metric."""
+    families = {}
+    for report in reports:
+        for metric, help_text, labels, value in report.samples():
+            family = families.setdefault(metric, (help_text, []))
+            family[1].append((labels, value))
+    lines = []
+    for metric, (help_text, samples) in families.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {'counter' if metric.endswith('_total') else 'gauge'}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_reports(reports, path):
+    """Write several reports: Prometheus text for '.prom' paths, else a JSON list."""
+    path = str(path)
+    with open(path, "w") as f:
+        if path.endswith(".prom"):
+            f.write(prometheus_text(reports))
+        else:
+            json.dump([r.to_dict() for r in reports], f, indent=2)
@@ -1,7 +1,21 @@
+from collections import Counter, deque
 from pathlib import Path
+import os
 import shutil
 from Profile import Profile
 from Subject import Subject
+from SubjectStats import SubjectStats
+from Checksums import ChecksumManifest, ChecksumMismatch, HashingCopy, hash_files
+from ContentStore import ContentStore
+from DestinationIndex import DestinationIndex
+from JobJournal import JobJournal, temp_name
+from Manifest import SubjectManifest
+from Metrics import NULL_METRICS, RunMetrics
+from Planner import OrganizePlan, PlannedFile
+from Scanner import SourceScanner
+from Sequences import SequenceDetector, format_ranges, frame_count, sequences_in
+from TypeSniffer import TypeSniffer
+from TransferEngine import MovePlanner, SizeRouter, SmallFileBatchEngine, TransferEngine
 
 class PipelineOrganizer:
     def __init__(self, profile):
@@ -9,6 +23,9 @@ class PipelineOrganizer:
             raise TypeError("profile must be a Profile instance")
         self.profile = profile
         self.rules = profile.rules
+        self.last_results = []
+        self.last_verify = None
+        self.last_report = None
 
     @classmethod
     def load_profile(cls, profile_name):
@@ -17,21 +34,18 @@ class PipelineOrganizer:
 
     def _next_pass_name(self, subject_name):
         """Return next pass name like 'pass001' for given subject_name."""
-        existing = self.profile.subjects.get(subject_name, {})
-        if not isinstance(existing, dict):
-            return "pass001"
-        nums = []
-        for key in existing.keys():
-            if isinstance(key, str) and key.lower().startswith("pass") and key[4:].isdigit():
-                nums.append(int(key[4:]))
-        nxt = (max(nums) + 1) if nums else 1
-        return f"pass{nxt:03d}"
+        return self.profile.next_pass_name(subject_name)
 
     def create_subject(self, subject_name, destination_root, pass_name=None):
         # if profile allows subsubjects, auto-create/increment pass if not provided
         if self.profile.allow_subsubjects:
             if pass_name is None:
-                pass_name = self._next_pass_name(subject_name)
+                # reserve the number and register the pass in one locked update, so
+                # concurrent organizers never share a pass or drop each other's
+                pass_name = self.profile.add_pass(subject_name, destination_root)
+                subject = Subject(subject_name, destination_root, self.profile, pass_name)
+                subject.create()
+                return subject
             subject = Subject(subject_name, destination_root, self.profile, pass_name)
             subject.create()
             # store the pass path (full pass folder) under the subject entry
@@ -44,47 +58,482 @@ class PipelineOrganizer:
             return subject
 
     def get_category(self, file_extension):
-        for category, extensions in self.rules.items():
-            normalized_exts = [e if e.startswith('.') else f".{e}" for e in extensions]
-            if file_extension.lower() in (e.lower() for e in normalized_exts):
-                return category
-        return "Others"
+        return self.profile.rule_index.get(file_extension, "Others")
 
-    def organize_to_subject(self, source_folder, subject, copy_function=shutil.copy2):
+    def classify(self, filename, st=None):
+        """Category for a file name, honouring compound suffixes like '.tar.gz'.
+
+        st (an os.stat_result) lets size/date predicate rules match too.
+        """
+        return self.profile.rule_index.classify(filename, st=st)
+
+    def _scan(self, source, subject, recursive=False, include=None, exclude=None, max_depth=None,
+              with_stat=False, sniff=None, sequences=None, metrics=NULL_METRICS):
+        """Yield a classified PlannedFile for every file SourceScanner finds.
+
+        sniff ('unknown'/True or 'all') re-checks files by content with a
+        TypeSniffer; see organize_to_subject(). sequences, a
+        SequenceDetector, regroups image-sequence frames into blocks.
+        metrics (a RunMetrics) times each of these stages.
+        """
+        scanner = metrics.timed_iter("scan", SourceScanner(source, recursive, include, exclude, max_depth,
+                                                           prune=[subject.destination_root / subject.name]))
+        rule_index = self.profile.rule_index
+        # predicate rules are compiled once per run; 'pass' dates refer to this subject's pass
+        classify = rule_index.matcher(pass_time=subject.created_timestamp())
+        if metrics.enabled:
+            def classify(name, st=None, _classify=classify):
+                with metrics.phase("classify"):
+                    return _classify(name, st)
+        if rule_index.needs_stat:
+            with_stat = True
+        items = (PlannedFile(Path(entry.path), entry.name, classify(entry.name, st), st)
+                 for entry in scanner for st in (entry.stat() if with_stat else None,))
+        sniffer = None
+        if sniff:
+            sniffer = TypeSniffer(self.profile.rule_index, "unknown" if sniff is True else sniff)
+            items = metrics.timed_iter("sniff", sniffer.refine(items))
+        if sequences is not None:
+            # after sniffing, so a sequence takes its first frame's detected type
+            items = metrics.timed_iter("sequences", sequences.group(items))
+        try:
+            yield from items
+            if sniffer is not None:
+                print(f"Content sniffing: {sniffer.summary()}")
+        finally:
+            if sniffer is not None:
+                sniffer.save()
+
+    def plan_organize(self, source_folder, subject, recursive=False, include=None, exclude=None,
+                      max_depth=None, sniff=None, sequences=False):
+        """Dry run: scan metadata only and return an OrganizePlan (nothing is written).
+
+        sequences=True groups image-sequence frames and lists them in plan.sequences.
+        """
+        source = Path(source_folder)
+        if not source.exists():
+            raise FileNotFoundError(f"Source folder '{source}' does not exist.")
+        plan = OrganizePlan(source, subject)
+        detector = SequenceDetector() if sequences else None
+        for item in self._scan(source, subject, recursive, include, exclude, max_depth, with_stat=True,
+                               sniff=sniff, sequences=detector):
+            plan.add(item)
+        if detector is not None:
+            plan.sequences = detector.sequences
+        return plan
+
+    def organize_to_subject(self, source_folder, subject, copy_function=shutil.copy2, workers=1,
+                            recursive=False, include=None, exclude=None, max_depth=None,
+                            incremental=False, hash_check=False, progress=None, cancel_event=None,
+                            dedup=False, move=False, large_file_threshold=None, small_file_batching=False,
+                            plan=None, on_collision="overwrite", journal=False, sniff=None,
+                            sequences=False, verify=None, metrics=None):
+        """Copy (or move, via copy_function) files from source_folder into subject.
+
+        workers > 1 runs the transfers concurrently; per-file results are kept
+        in self.last_results in scan order. recursive/include/exclude/max_depth
+        are passed to SourceScanner; files are transferred while the scan is
+        still running. incremental=True skips files the subject's manifest (or
+        the destination itself) shows as unchanged; hash_check compares
+        content hashes when sizes match but mtimes differ.
+
+        move=True (or copy_function=shutil.move) goes through MovePlanner:
+        a batch of renames when source and destination share a device, a
+        verified copy-then-unlink otherwise. Each result's method records
+        which path the file took.
+
+        large_file_threshold (bytes) sends files at least that big to
+        large_file_copy (copy_file_range/sendfile/chunked) instead of copy2.
+
+        small_file_batching=True copies through SmallFileBatchEngine (batched
+        asyncio read/write pipeline), which pays off for many tiny files; it
+        is ignored for moves and dedup.
+
+        dedup=True places files through the subject's ContentStore (reflink or
+        hardlink to a single stored copy) instead of calling copy_function;
+        with copy_function=shutil.move the source is removed afterwards.
+
+        on_collision picks what happens when the destination name is taken
+        (by an existing file or another source): 'overwrite' (default), 'skip',
+        'rename' or 'keep-newer'; see DestinationIndex. A file that replaces
+        an existing one is written under a temp name and renamed over it, so
+        a hardlinked (dedup) destination is never written through.
+
+        plan, an OrganizePlan from plan_organize(), is executed as-is instead
+        of scanning source_folder again.
+
+        sniff='unknown' (or True) reads the first bytes of files whose name
+        lands them in 'Others' and files them by their real type (EXR, PNG,
+        FBX, MOV, ...); sniff='all' also re-files mislabelled files. See
+        TypeSniffer; results are cached per inode and mtime.
+
+        sequences=True detects image sequences ('shot_v001.####.exr') during
+        the scan: each sequence gets one category decision and its frames are
+        transferred as one contiguous block in frame order. Frame ranges of
+        placed sequences ('1001-1240, missing 1100') are always recorded in
+        the stats sidecar and shown by summarize_subject().
+
+        verify='record' writes a BLAKE2b checksum of every placed file to the
+        pass folder's ChecksumManifest; plain copies are hashed while they
+        are copied (HashingCopy), anything else (renames, reflinks, the
+        large-file and small-file paths) is hashed afterwards in a process
+        pool. verify='full' (or True) also re-reads each destination in the
+        pool and compares it to its source; any mismatch makes the run
+        return False. Moves and dedup moves hash the source while placing it
+        and, with 'full', compare the copy before the source is removed
+        (MovePlanner, ContentStore.place). Results are kept in self.last_verify.
+
+        journal=True makes the run resumable: files are written under a temp
+        name and renamed into place when complete, and a JobJournal in the
+        pass folder records the job and every file's progress. If the run
+        dies or is cancelled, resume_job() finishes it.
+
+        metrics=True (or a RunMetrics) times the run's phases (setup, scan,
+        classify, mkdir, resolve, transfer, finalize, ...) and counts files,
+        bytes and per-category throughput; the RunReport is kept in
+        self.last_report. Off by default, when the hooks are no-ops.
+
+        progress, if given, is called with each TransferResult as it completes.
+        Setting cancel_event (a threading.Event) stops the run between files;
+        transfers already in flight finish and False is returned.
+        """
+        # reset first, so an early return never leaves the previous run's results behind
+        self.last_results = []
+        self.last_verify = None
         source = Path(source_folder)
         if not source.exists():
             print(f"Source folder '{source}' does not exist.")
             return False
         if not isinstance(subject, Subject):
             raise TypeError("subject must be a Subject instance")
+        if metrics is True:
+            metrics = RunMetrics()
+        m = metrics or NULL_METRICS
+        self.last_report = None
+        setup = m.start()
+
+        journal_options = {
+            "recursive": recursive, "include": include, "exclude": exclude, "max_depth": max_depth,
+            "incremental": incremental, "hash_check": hash_check, "dedup": dedup,
+            "move": move or copy_function is shutil.move, "large_file_threshold": large_file_threshold,
+            "small_file_batching": small_file_batching, "on_collision": on_collision, "workers": workers,
+            "sniff": sniff, "sequences": sequences, "verify": verify,
+        }
+        if journal is True:
+            journal = JobJournal(subject.destination_path)
+            if journal.exists():
+                print(f"⚠️ '{subject.destination_path}' has an unfinished job; resume it before starting another.")
+                return False
+        completed = set()
 
         subject.create()
+        if journal:
+            if journal.job is not None:
+                completed = journal.completed
+                journal.reopen()
+            else:
+                journal.start(source, journal_options)
+
+        manifest = SubjectManifest(subject.destination_path) if incremental else None
+        index = DestinationIndex(subject.destination_path, on_collision)
+        stats = SubjectStats(subject.destination_path)
+        stats.start_run()
+        counts = {"new": 0, "updated": 0, "skipped": 0}
+        # per category: [files added, byte delta] for the stats sidecar
+        changes = {}
+        # per category: names placed this run, for the sidecar's sequence frame ranges
+        placed = {}
+        # bookkeeping per yielded job, consumed in order as results arrive
+        pending = deque()
+
+        # every rule folder exists after subject.create(); make 'Others' once too
+        (subject.destination_path / "Others").mkdir(exist_ok=True)
+        created = set(subject.folders) | {"Others"}
+
+        if plan is not None:
+            candidates = plan.files
+        else:
+            detector = SequenceDetector() if sequences else None
+            # only the manifest and keep-newer need source mtimes up front (and
+            # size/date rules, see _scan); byte counts come from the transfers
+            with_stat = incremental or on_collision == "keep-newer"
+            candidates = self._scan(source, subject, recursive, include, exclude, max_depth,
+                                    with_stat=with_stat, sniff=sniff, sequences=detector, metrics=m)
+
+        def jobs():
+            for item in candidates:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                if completed and str(item.source) in completed:
+                    continue
+                dest_dir = subject.destination_path / item.category
+                if item.category not in created:
+                    with m.phase("mkdir"):
+                        dest_dir.mkdir(parents=True, exist_ok=True)
+                    created.add(item.category)
+                resolving = m.start()
+                name, policy = item.name, None
+                if manifest is not None:
+                    prior = manifest.placed_at(item.source)
+                    if prior is not None and prior.startswith(f"{item.category}/"):
+                        # an earlier run placed this very source (maybe renamed): update it in place
+                        name, policy = prior[len(item.category) + 1:], "overwrite"
+                    rel = f"{item.category}/{name}"
+                    status = manifest.check(rel, item.source, item.stat, dest_dir / name, hash_check,
+                                            index.names(item.category))
+                    if status == "skip":
+                        index.names(item.category).add(name)
+                        counts["skipped"] += 1
+                        m.stop("resolve", resolving)
+                        continue
+                    owner = manifest.entries.get(rel)
+                    if owner is not None and owner["source"] != str(item.source):
+                        status = "new"
+                else:
+                    status = None
+                name = index.resolve(item.category, name,
+                                     item.stat.st_mtime_ns if item.stat is not None else None, policy, item.size)
+                m.stop("resolve", resolving)
+                if name is None:
+                    continue
+                rel = f"{item.category}/{name}"
+                replaced = index.last_replaced
+                # a file being replaced may be a hardlink into the dedup store (or
+                # another pass); writing through it would change every copy, so
+                # the new bytes go to a temp name that is renamed over it
+                staged = bool(journal) or replaced is not None
+                pending.append((status, rel, item.stat, replaced, staged))
+                if journal:
+                    journal.copying(item.source, rel)
+                if staged:
+                    name = temp_name(name)
+                yield item.source, dest_dir / name, item.category, item.stat.st_size if item.stat is not None else None
+
+        move = move or copy_function is shutil.move
+        plain_copy = shutil.copy2 if move else copy_function
+        if verify is True:
+            verify = "full"
+        hashing = None
+        if verify and not (move or dedup) and plain_copy is shutil.copy2:
+            plain_copy = hashing = HashingCopy()
+        if large_file_threshold is not None:
+            plain_copy = SizeRouter(large_file_threshold, plain_copy)
+        store = planner = None
+        if dedup:
+            store = ContentStore.for_subject(subject)
+            remove_source = move
+            check_before_remove = verify == "full"
+
+            def copy_function(src, dst):
+                return store.place(src, dst, remove_source, check_before_remove)
+        elif move:
+            planner = MovePlanner(source, subject.destination_path, plain_copy, verify)
+            print(f"Move plan: {planner.describe()}")
+            copy_function = planner.move_function()
+        else:
+            copy_function = plain_copy
 
+        if small_file_batching and not (move or dedup):
+            engine = SmallFileBatchEngine(copy_function, workers)
+        else:
+            engine = TransferEngine(copy_function, workers)
+        # (relative destination, source, destination) of placed files, for verify
+        placed_files = []
+        # files whose copy failed its checksum before the source was removed
+        refused = []
         copied = 0
-        for item in source.iterdir():
-            if item.is_file():
-                category = self.get_category(item.suffix)
-                dest_dir = subject.destination_path / category
-                dest_dir.mkdir(parents=True, exist_ok=True)
+        m.stop("setup", setup)
+        transfer = m.start()
+        for result in engine.run(jobs()):
+            self.last_results.append(result)
+            status, rel, stat, replaced, staged = pending.popleft()
+            if staged:
+                final = subject.destination_path / rel
                 try:
-                    copy_function(str(item), str(dest_dir / item.name))
-                    copied += 1
-                except Exception as e:
-                    print(f"Failed to copy '{item}': {e}")
+                    if result.ok:
+                        os.replace(result.destination, final)
+                        result.destination = final
+                    else:
+                        os.unlink(result.destination)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    result.ok, result.error = False, e
+            if journal:
+                if result.ok:
+                    journal.done(result.source)
+                else:
+                    journal.failed(result.source, result.error)
+            if result.ok:
+                copied += 1
+            else:
+                print(f"Failed to copy '{result.source}': {result.error}")
+                if isinstance(result.error, ChecksumMismatch):
+                    refused.append(rel)
+            if result.ok:
+                change = changes.setdefault(result.category, [0, 0])
+                change[0] += 1 if replaced is None else 0
+                change[1] += result.size - (replaced or 0)
+                placed.setdefault(result.category, []).append(rel[len(result.category) + 1:])
+                if verify:
+                    placed_files.append((rel, result.source, result.destination))
+            if manifest is not None and result.ok:
+                counts[status] += 1
+                manifest.record(rel, result.source, stat)
+            m.file(result)
+            if progress is not None:
+                progress(result)
+        m.stop("transfer", transfer)
+        finalize = m.start()
 
         print(f"Copied {copied} files into subject '{subject.name}' at '{subject.destination_path}'")
-        return True
+        if move and self.last_results:
+            methods = Counter(r.method for r in self.last_results if r.ok)
+            print("Moved by: " + ", ".join(f"{m} {n}" for m, n in methods.most_common()))
+        run_sequences = {}
+        for category, names in placed.items():
+            found = sequences_in(names)
+            if found:
+                run_sequences[category] = found
+        stats.apply_run(changes, counts if manifest is not None else None, run_sequences)
+        for category, found in run_sequences.items():
+            for pattern, ranges in found.items():
+                print(f"Sequence {category}/{pattern}: {frame_count(ranges)} frames, {format_ranges(ranges)}")
+        if any(index.counts.values()):
+            print(f"Name collisions ({on_collision}): {index.summary()}")
+        if store is not None:
+            print(f"Dedup: {store.summary()}")
+        if manifest is not None:
+            manifest.last_run = counts
+            manifest.save()
+            print(f"Incremental: {counts['new']} new, {counts['updated']} updated, {counts['skipped']} unchanged skipped")
+        cancelled = cancel_event is not None and cancel_event.is_set()
+        if journal:
+            # keep the journal while there is anything left for resume_job() to do
+            journal.close(remove=not cancelled and copied == len(self.last_results))
+        m.stop("finalize", finalize)
+        if verify:
+            with m.phase("verify"):
+                # digests taken while the sources still existed (copy, cross-device move, dedup store)
+                during_copy, checked = {}, set()
+                for hashed in (hashing, planner, store):
+                    if hashed is not None:
+                        during_copy.update(hashed.digests)
+                        checked |= getattr(hashed, "checked", set())
+                self.last_verify = self._verify_placed(subject, placed_files, during_copy, checked, verify,
+                                                       move or dedup, refused)
+        if m.enabled:
+            if manifest is not None:
+                m.count("skipped", counts["skipped"])
+            for outcome, n in index.counts.items():
+                if n:
+                    m.count(f"collisions_{outcome}", n)
+            self.last_report = m.report(source=str(source), subject=subject.name,
+                                        destination=str(subject.destination_path))
+        if cancelled:
+            print("Organize cancelled before all files were processed.")
+            return False
+        return not (self.last_verify and self.last_verify["mismatched"])
+
+    def _verify_placed(self, subject, placed_files, during_copy, checked, mode, source_may_be_gone,
+                       refused=()):
+        """Checksum placed files into the pass's ChecksumManifest (see organize_to_subject).
+
+        during_copy maps sources to digests taken while placing them;
+        sources in checked already had their destination compared before
+        the source was removed, so they are not read again. refused lists
+        files that failed that comparison (their sources were kept).
+        """
+        checksums = ChecksumManifest(subject.destination_path)
+        to_hash = []
+        for rel, source, destination in placed_files:
+            if str(source) in checked:
+                continue
+            if mode == "full" or str(source) not in during_copy:
+                to_hash.append(destination)
+            if mode == "full" and str(source) not in during_copy and not source_may_be_gone:
+                to_hash.append(source)
+        digests = dict(zip(map(str, to_hash), hash_files(to_hash)))
+        mismatched = list(refused)
+        for rel, source, destination in placed_files:
+            source_digest = during_copy.get(str(source)) or digests.get(str(source))
+            dest_digest = digests.get(str(destination), source_digest)
+            if dest_digest is None or (source_digest is not None and dest_digest != source_digest):
+                mismatched.append(rel)
+                continue
+            checksums.record(rel, dest_digest)
+        checksums.save()
+        report = {"mode": mode, "files": len(placed_files), "hashed_during_copy": len(during_copy),
+                  "checked_before_unlink": len(checked), "hashed_after": len(to_hash), "mismatched": mismatched}
+        print(f"Checksums ({mode}): {len(placed_files)} files, {len(during_copy)} hashed while copying, "
+              f"{len(checked)} compared before removing the source, {len(to_hash)} hashed afterwards")
+        for rel in mismatched:
+            print(f"⚠️ Checksum mismatch: {rel}")
+        return report
+
+    def verify_subject(self, subject, workers=None):
+        """Re-hash a pass folder against its checksum manifest and print the outcome."""
+        checksums = ChecksumManifest(subject.destination_path)
+        if not checksums.entries:
+            print(f"No checksums recorded for '{subject.destination_path}'.")
+            return None
+        report = checksums.verify(workers)
+        print(f"Verified {report['checked']} files: {len(report['mismatched'])} mismatched, "
+              f"{len(report['missing'])} missing")
+        for rel in report["mismatched"]:
+            print(f"⚠️ Checksum mismatch: {rel}")
+        for rel in report["missing"]:
+            print(f"⚠️ Missing or unreadable: {rel}")
+        return report
 
-    def summarize_subject(self, subject):
+    def resume_job(self, subject, workers=None, progress=None, cancel_event=None):
+        """Finish a journaled organize run that died or was cancelled.
+
+        Partial temp files are removed, files already in place are skipped
+        and the rest of the job is run again with its original options.
+        Returns None when the pass folder has no unfinished job.
+        """
+        journal = JobJournal(subject.destination_path)
+        if not journal.exists():
+            print(f"No unfinished job in '{subject.destination_path}'.")
+            return None
+        job, completed, _ = journal.replay()
+        if job is None:
+            print(f"⚠️ Journal '{journal.path}' has no job record; removing it.")
+            journal.close(remove=True)
+            return None
+        removed, finished = journal.recover()
+        print(f"Resuming job from '{job['source']}': {len(completed)} files already in place, "
+              f"{removed} partial files removed, {finished} interrupted files completed")
+        options = dict(job["options"])
+        if workers is not None:
+            options["workers"] = workers
+        return self.organize_to_subject(job["source"], subject, progress=progress, cancel_event=cancel_event,
+                                        journal=journal, **options)
+
+    def summarize_subject(self, subject, rescan=False):
+        """Print per-category counts from the pass folder's stats sidecar.
+
+        The sidecar is kept current by organize runs, so this normally reads
+        one small file. rescan=True re-lists the category folders whose mtime
+        changed since they were last counted (e.g. after manual edits).
+        Image sequences are listed with their frame ranges.
+        """
         print(f"\nSummary for subject '{subject.name}':")
         if not subject.destination_path.exists():
             print("No files or folders found for this subject.")
             return
-        for folder in subject.destination_path.iterdir():
-            if folder.is_dir():
-                count = len([p for p in folder.iterdir() if p.is_file()])
-                print(f"  • {folder.name}: {count} files")
-
+        stats = SubjectStats(subject.destination_path)
+        categories = stats.refresh(rescan=rescan)
+        last_run = stats.last_run
+        if last_run:
+            print(f"  Last incremental run: {last_run.get('new', 0)} new, "
+                  f"{last_run.get('updated', 0)} updated, {last_run.get('skipped', 0)} skipped")
+        for category, totals in categories.items():
+            print(f"  • {category}: {totals['files']} files ({totals['bytes'] / 1e6:.1f} MB)")
+            for pattern, ranges in totals.get("sequences", {}).items():
+                print(f"      ▸ {pattern}: {frame_count(ranges)} frames, {format_ranges(ranges)}")
+        return categories
 
 def main():
     print("=== Pipeline Organizer Tool ===")
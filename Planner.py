@@ -0,0 +1,117 @@
+import os
+
+
+class PlannedFile:
+    """One source file and where an organize run would put it."""
+
+    __slots__ = ("source", "name", "category", "stat")
+
+    def __init__(self, source, name, category, stat=None):
+        self.source = source
+        self.name = name
+        self.category = category
+        self.stat = stat
+
+    @property
+    def size(self):
+        return self.stat.st_size if self.stat is not None else 0
+
+    @property
+    def relative_destination(self):
+        return f"{self.category}/{self.name}"
+
+
+class OrganizePlan:
+    """Result of a dry run: every file an organize run would place, plus totals.
+
+    Built by PipelineOrganizer.plan_organize() from a single metadata-only
+    scan; nothing is created or copied. Pass it back as
+    organize_to_subject(..., plan=plan) to execute it without rescanning.
+    Destinations are kept relative to the pass folder, so a plan made
+    before the pass is allocated still applies to the pass actually used.
+    """
+
+    def __init__(self, source, subject):
+        self.source = source
+        self.subject = subject
+        self.files = []
+        self.categories = {}
+        self.total_bytes = 0
+        # relative destination -> every source that would land there (2+ = collision)
+        self._targets = {}
+        # relative destinations that already exist in the pass folder
+        self.existing = []
+        self._existing_names = {}
+        # ImageSequence objects when planned with sequence detection
+        self.sequences = []
+
+    def _existing_in(self, category):
+        names = self._existing_names.get(category)
+        if names is None:
+            names = set()
+            try:
+                with os.scandir(self.subject.destination_path / category) as it:
+                    names = {e.name for e in it}
+            except OSError:
+                pass
+            self._existing_names[category] = names
+        return names
+
+    def add(self, item):
+        self.files.append(item)
+        totals = self.categories.setdefault(item.category, {"files": 0, "bytes": 0})
+        totals["files"] += 1
+        totals["bytes"] += item.size
+        self.total_bytes += item.size
+        rel = item.relative_destination
+        self._targets.setdefault(rel, []).append(item.source)
+        if item.name in self._existing_in(item.category):
+            self.existing.append(rel)
+
+    @property
+    def collisions(self):
+        """{relative destination: [sources]} for names claimed by several sources."""
+        return {rel: sources for rel, sources in self._targets.items() if len(sources) > 1}
+
+    @property
+    def others(self):
+        return [item.source for item in self.files if item.category == "Others"]
+
+    def __len__(self):
+        return len(self.files)
+
+    def to_dict(self, include_files=False):
+        data = {
+            "source": str(self.source),
+            "destination": str(self.subject.destination_path),
+            "files": len(self.files),
+            "bytes": self.total_bytes,
+            "categories": self.categories,
+            "collisions": {rel: [str(s) for s in sources] for rel, sources in self.collisions.items()},
+            "existing": self.existing,
+            "others": [str(s) for s in self.others],
+        }
+        if self.sequences:
+            data["sequences"] = [{"pattern": seq.pattern, "category": seq.items[0][1].category,
+                                  "frames": len(seq), "ranges": seq.ranges} for seq in self.sequences]
+        if include_files:
+            data["plan"] = [{"source": str(i.source), "destination": i.relative_destination, "bytes": i.size}
+                            for i in self.files]
+        return data
+
+    def describe(self):
+        lines = [f"Plan: {len(self.files)} files, {self.total_bytes / 1e6:.1f} MB "
+                 f"from '{self.source}' into '{self.subject.destination_path}'"]
+        for category, totals in sorted(self.categories.items()):
+            lines.append(f"  • {category}: {totals['files']} files, {totals['bytes'] / 1e6:.1f} MB")
+        collisions = self.collisions
+        if collisions:
+            lines.append(f"  ⚠️ {len(collisions)} destination names claimed by more than one source")
+        if self.existing:
+            lines.append(f"  ⚠️ {len(self.existing)} files already exist at the destination")
+        for seq in self.sequences:
+            lines.append(f"  ▸ {seq.report()}")
+        others = self.categories.get("Others", {}).get("files", 0)
+        if others:
+            lines.append(f"  {others} files match no rule and go to 'Others'")
+        return "\n".join(lines)
@@ -1,7 +1,22 @@
+from contextlib import contextmanager
 from pathlib import Path
 import json
+import os
+from AtomicFile import file_lock, write_json
+from RuleIndex import RuleIndex
+
+
+def parse_pass_number(pass_name):
+    """3 for 'pass003', None for names that aren't passNNN."""
+    if isinstance(pass_name, str) and pass_name.lower().startswith("pass") and pass_name[4:].isdigit():
+        return int(pass_name[4:])
+    return None
+
 
 class Profile:
+    # optional registry backend (e.g. ProfileStore.SqliteProfileStore); None = JSON files
+    store = None
+
     DEFAULT_RULES = {
         "Maya": [".ma", ".mb"],
         "Models": [".fbx", ".obj"],
@@ -11,7 +26,8 @@ class Profile:
         "Zbrush Scenes": [".zpr", ".ztl"]
     }
 
-    def __init__(self, name, rules=None, notes="", subjects=None, allow_subsubjects=False):
+    def __init__(self, name, rules=None, notes="", subjects=None, allow_subsubjects=False, compact=False,
+                 pass_counters=None):
         self.name = name
         # copy rules to avoid shared mutable default between instances
         self.rules = dict(rules) if rules is not None else dict(Profile.DEFAULT_RULES)
@@ -19,27 +35,122 @@ class Profile:
         # store a dict copy if provided
         self.subjects = dict(subjects) if subjects is not None else {}
         self.allow_subsubjects = allow_subsubjects
+        # highest pass number handed out per subject, so allocation never rescans passes
+        self.pass_counters = dict(pass_counters) if pass_counters is not None else {}
+        # compact JSON (no indentation) keeps very large profiles fast to write
+        self.compact = compact
+        # folder the profile was loaded from / last saved to
+        self.folder = "profiles"
+        self._batch_depth = 0
+        self._dirty = False
+        # {(subject, pass): path} as this instance last read or wrote them, so a
+        # locked update can tell local changes from other processes' changes
+        self._synced = {}
+
+    # ------------------ RULES ------------------
+    @property
+    def rules(self):
+        return self._rules
+
+    @rules.setter
+    def rules(self, value):
+        self._rules = value
+        self._rule_index = None
+
+    @property
+    def rule_index(self):
+        """Compiled extension lookup, rebuilt lazily after the rules change."""
+        if self._rule_index is None:
+            self._rule_index = RuleIndex(self._rules)
+        return self._rule_index
+
+    def invalidate_rules(self):
+        """Call after mutating self.rules in place so the index is rebuilt."""
+        self._rule_index = None
 
     # ------------------ SAVE / LOAD ------------------
-    def save(self, folder="profiles"):
+    def save(self, folder=None):
+        """Write the profile to <folder>/<name>.json atomically.
+
+        Inside a batch() block the write is deferred until the block exits.
+        """
+        if folder is not None:
+            self.folder = folder
+        if self._batch_depth:
+            self._dirty = True
+            return
+        self._write()
+
+    def _write(self):
+        if Profile.store is not None:
+            entries = self._registry_entries(self.subjects)
+            # rows other processes added are kept; only what this instance removed is deleted
+            Profile.store.save_data(self._to_dict(), removed=self._synced.keys() - entries.keys())
+            self._dirty = False
+            self._synced = entries
+            print(f"✅ Profile '{self.name}' saved to {Profile.store.path}")
+            return
         script_folder = Path(__file__).parent
-        folder_path = script_folder / folder
+        folder_path = script_folder / self.folder
         folder_path.mkdir(parents=True, exist_ok=True)
 
         profile_path = folder_path / f"{self.name}.json"
+        # a crash mid-write never leaves a truncated profile behind
+        if self.compact:
+            write_json(profile_path, self._to_dict(), fsync=True, separators=(",", ":"))
+        else:
+            write_json(profile_path, self._to_dict(), fsync=True, indent=4)
+        self._dirty = False
+        self._synced = self._registry_entries(self.subjects)
+        print(f"✅ Profile '{self.name}' saved to {profile_path}")
+
+    def _to_dict(self):
         data = {
             "name": self.name,
             "rules": self.rules,
             "notes": self.notes,
             "subjects": self.subjects,
-            "allow_subsubjects": self.allow_subsubjects
+            "allow_subsubjects": self.allow_subsubjects,
+            "pass_counters": self.pass_counters
         }
-        with open(profile_path, "w") as f:
-            json.dump(data, f, indent=4)
-        print(f"✅ Profile '{self.name}' saved to {profile_path}")
+        if self.compact:
+            data["compact"] = True
+        return data
+
+    @staticmethod
+    def use_store(store):
+        """Route load/save/list/delete through store (None restores JSON files)."""
+        Profile.store = store
+
+    @contextmanager
+    def batch(self):
+        """Defer saves made inside the block and write the profile once at the end.
+
+        with profile.batch():
+            for name, path in shots:
+                profile.add_subject(name, path)
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty:
+                if Profile.store is None:
+                    # merge with what other processes wrote while the batch ran
+                    self._locked_update(lambda: None)
+                else:
+                    self.save()
 
     @classmethod
     def load(cls, name, folder="profiles"):
+        if Profile.store is not None:
+            data = Profile.store.load_data(name)
+            if data is None:
+                raise FileNotFoundError(f"Profile '{name}' not found in {Profile.store.path}")
+            profile = cls(**data)
+            profile._synced = cls._registry_entries(profile.subjects)
+            return profile
         script_folder = Path(__file__).parent
         folder_path = script_folder / folder
         profile_path = folder_path / f"{name}.json"
@@ -47,17 +158,24 @@ class Profile:
             raise FileNotFoundError(f"Profile '{name}' not found in {folder_path}")
         with open(profile_path, "r") as f:
             data = json.load(f)
-        return cls(
+        profile = cls(
             name=data.get("name"),
             rules=data.get("rules"),
             notes=data.get("notes", ""),
             subjects=data.get("subjects", {}),
-            allow_subsubjects=data.get("allow_subsubjects", False)
+            allow_subsubjects=data.get("allow_subsubjects", False),
+            compact=data.get("compact", False),
+            pass_counters=data.get("pass_counters")
         )
+        profile.folder = folder
+        profile._synced = cls._registry_entries(profile.subjects)
+        return profile
 
     # ------------------ LIST / CREATE / DELETE ------------------
     @staticmethod
     def list_profiles(folder="profiles"):
+        if Profile.store is not None:
+            return Profile.store.list_names()
         script_folder = Path(__file__).parent
         folder_path = script_folder / folder
         if not folder_path.exists():
@@ -90,7 +208,10 @@ class Profile:
         script_folder = Path(__file__).parent
         folder_path = script_folder / folder
         profile_path = folder_path / f"{name}.json"
-        if profile_path.exists():
+        if Profile.store is not None and Profile.store.delete(name):
+            print(f"✅ Profile '{name}' deleted.")
+            return True
+        if Profile.store is None and profile_path.exists():
             profile_path.unlink()
             print(f"✅ Profile '{name}' deleted.")
             return True
@@ -98,27 +219,170 @@ class Profile:
         return False
 
     # ------------------ SUBJECT MANAGEMENT ------------------
-    def add_subject(self, subject_name, destination_path, pass_name=None):
+    def _pass_high_water(self, subject_name):
+        """Highest pass number used by subject_name (scans keys once for old profiles)."""
+        if subject_name not in self.pass_counters:
+            entry = self.subjects.get(subject_name)
+            nums = [parse_pass_number(k) for k in entry] if isinstance(entry, dict) else []
+            self.pass_counters[subject_name] = max((n for n in nums if n is not None), default=0)
+        return self.pass_counters[subject_name]
+
+    def next_pass_name(self, subject_name):
+        """Name the next allocate_pass() call would return, without reserving it."""
+        return f"pass{self._pass_high_water(subject_name) + 1:03d}"
+
+    def _reserve_pass(self, subject_name):
+        number = self._pass_high_water(subject_name) + 1
+        self.pass_counters[subject_name] = number
+        return number
+
+    def allocate_pass(self, subject_name):
+        """Reserve and return the next 'passNNN' name for subject_name.
+
+        The per-subject high-water mark is persisted with the profile. Two
+        processes allocating for the same subject get different numbers: the
+        SQLite store bumps the counter in one transaction, JSON profiles are
+        re-read and written under a lock file, even inside batch(), whose
+        pending changes are written along with the reservation. To reserve a
+        pass and register its folder in one step, use add_pass().
+        """
+        if Profile.store is not None:
+            number = Profile.store.allocate_pass(self.name, subject_name, self._pass_high_water(subject_name))
+            self.pass_counters[subject_name] = number
+        else:
+            number = self._locked_update(lambda: self._reserve_pass(subject_name))
+        return f"pass{number:03d}"
+
+    # ------------------ LOCKED REGISTRY UPDATES (JSON profiles) ------------------
+    @staticmethod
+    def _registry_entries(subjects):
+        entries = {}
+        for subject_name, entry in subjects.items():
+            if isinstance(entry, dict):
+                entries.update(((subject_name, pass_name), path) for pass_name, path in entry.items())
+            else:
+                entries[(subject_name, None)] = entry
+        return entries
+
+    def _merge_from_disk(self, data):
+        """Adopt the registry on disk, keeping entries added or changed here since the last sync.
+
+        Entries this instance had synced but that are gone from disk were
+        removed by another process and are dropped; synced entries gone from
+        this instance (removed inside a batch()) are dropped from disk too.
+        """
+        subjects = {k: dict(v) if isinstance(v, dict) else v for k, v in (data.get("subjects") or {}).items()}
+        local = self._registry_entries(self.subjects)
+        removed_here = self._synced.keys() - local.keys()
+        for subject_name, pass_name in removed_here:
+            entry = subjects.get(subject_name)
+            if pass_name is None:
+                if not isinstance(entry, dict):
+                    subjects.pop(subject_name, None)
+            elif isinstance(entry, dict):
+                entry.pop(pass_name, None)
+                if not entry:
+                    del subjects[subject_name]
+        on_disk = self._registry_entries(subjects)
+        for (subject_name, pass_name), path in local.items():
+            key = (subject_name, pass_name)
+            if key in self._synced and (key not in on_disk or path == self._synced[key]):
+                continue  # unchanged here: the disk's version (or its removal) wins
+            if pass_name is None:
+                subjects[subject_name] = path
+            else:
+                target = subjects.get(subject_name)
+                if not isinstance(target, dict):
+                    target = subjects[subject_name] = {}
+                target[pass_name] = path
+        self.subjects = subjects
+        for subject_name, number in (data.get("pass_counters") or {}).items():
+            if subject_name not in subjects and any(key[0] == subject_name for key in removed_here):
+                continue  # removed here entirely: numbering starts over
+            if number > self.pass_counters.get(subject_name, 0):
+                self.pass_counters[subject_name] = number
+
+    def _locked_update(self, mutate):
+        """Re-read the profile, apply mutate() and save it, all under the profile's lock file.
+
+        Several processes can then add passes and subjects to one JSON
+        profile without losing each other's entries. Returns mutate()'s result.
+        """
+        folder_path = Path(__file__).parent / self.folder
+        folder_path.mkdir(parents=True, exist_ok=True)
+        with file_lock(folder_path / f"{self.name}.lock"):
+            profile_path = folder_path / f"{self.name}.json"
+            if profile_path.exists():
+                with open(profile_path, "r") as f:
+                    self._merge_from_disk(json.load(f))
+            result = mutate()
+            self._write()
+        return result
+
+    # ------------------ SUBJECTS ------------------
+    def _register(self, subject_name, destination_path, pass_name=None):
+        """Record a subject (or one of its passes) in memory; returns the pass name."""
         # normalize and store absolute path
         dest_str = str(Path(destination_path).resolve())
         if self.allow_subsubjects:
+            if not pass_name:
+                pass_name = f"pass{self._reserve_pass(subject_name):03d}"
+            else:
+                number = parse_pass_number(pass_name)
+                if number is not None and number > self._pass_high_water(subject_name):
+                    self.pass_counters[subject_name] = number
             entry = self.subjects.get(subject_name)
             if not isinstance(entry, dict):
                 entry = {}
-            if not pass_name:
-                pass_name = "pass001"
-                if entry:
-                    nums = [int(k[4:]) for k in entry.keys() if k.lower().startswith("pass") and k[4:].isdigit()]
-                    if nums:
-                        pass_name = f"pass{max(nums)+1:03d}"
             entry[pass_name] = dest_str
             self.subjects[subject_name] = entry
         else:
             # single destination stored as string
             self.subjects[subject_name] = dest_str
+        return pass_name
+
+    def add_pass(self, subject_name, destination_root):
+        """Reserve the next pass of subject_name and register <root>/<subject>/<pass> in one step.
+
+        For JSON profiles both happen in a single locked read-modify-write.
+        Returns the pass name.
+        """
+        def register():
+            number = self._reserve_pass(subject_name)
+            pass_name = f"pass{number:03d}"
+            self._register(subject_name, Path(destination_root) / subject_name / pass_name, pass_name)
+            return pass_name
+
+        if Profile.store is None:
+            return self._locked_update(register)
+        pass_name = self.allocate_pass(subject_name)
+        self.add_subject(subject_name, Path(destination_root) / subject_name / pass_name, pass_name)
+        return pass_name
+
+    def add_subject(self, subject_name, destination_path, pass_name=None):
+        if Profile.store is None and not self._batch_depth:
+            return self._locked_update(lambda: self._register(subject_name, destination_path, pass_name))
+        # a passless subject replaces all of its rows; a pass only replaces an old passless entry
+        replaced_layout = (not self.allow_subsubjects) or isinstance(self.subjects.get(subject_name), str)
+        if self.allow_subsubjects and not pass_name:
+            pass_name = self.allocate_pass(subject_name)
+        pass_name = self._register(subject_name, destination_path, pass_name)
+        dest_str = str(Path(destination_path).resolve())
+        if Profile.store is not None and not self._batch_depth:
+            # write just this row instead of the whole profile
+            if replaced_layout:
+                Profile.store.delete_subject(self.name, subject_name)
+                self._synced = {key: path for key, path in self._synced.items() if key[0] != subject_name}
+            stored_pass = pass_name if self.allow_subsubjects else None
+            if Profile.store.put_subject(self.name, subject_name, stored_pass, dest_str):
+                self._synced[(subject_name, stored_pass)] = dest_str
+                if self.allow_subsubjects:
+                    Profile.store.note_pass(self.name, subject_name, self.pass_counters[subject_name])
+                return pass_name
         self.save()
+        return pass_name
 
-    def remove_subject(self, subject_name, pass_name=None):
+    def _unregister(self, subject_name, pass_name=None):
         if self.allow_subsubjects and pass_name:
             entry = self.subjects.get(subject_name)
             if isinstance(entry, dict) and pass_name in entry:
@@ -129,6 +393,21 @@ class Profile:
                     self.subjects[subject_name] = entry
         elif subject_name in self.subjects:
             del self.subjects[subject_name]
+        if subject_name not in self.subjects:
+            # subject is gone entirely: numbering starts over if it is recreated
+            self.pass_counters.pop(subject_name, None)
+
+    def remove_subject(self, subject_name, pass_name=None):
+        if Profile.store is None and not self._batch_depth:
+            self._locked_update(lambda: self._unregister(subject_name, pass_name))
+            return
+        self._unregister(subject_name, pass_name)
+        if Profile.store is not None and not self._batch_depth:
+            stored_pass = pass_name if self.allow_subsubjects else None
+            Profile.store.delete_subject(self.name, subject_name, stored_pass)
+            self._synced = {key: path for key, path in self._synced.items()
+                            if key[0] != subject_name or (stored_pass and key[1] != stored_pass)}
+            return
         self.save()
 
     def list_subjects(self):
@@ -139,13 +418,35 @@ class Profile:
         if not self.subjects:
             print(f"No subjects registered for profile '{self.name}'.")
             return
-        print(f"\n=== Subjects for Profile: {self.name} ===")
+        # build the listing first and print once; much faster for big registries
+        lines = [f"\n=== Subjects for Profile: {self.name} ==="]
         for subj, entry in self.subjects.items():
             if self.allow_subsubjects and isinstance(entry, dict):
-                print(f" - {subj}:")
-                for p, path in entry.items():
-                    print(f"    • {p} -> {path}")
+                lines.append(f" - {subj}:")
+                lines.extend(f"    • {p} -> {path}" for p, path in entry.items())
             else:
-                print(f" - {subj} -> {entry}")
-        print("=========================================\n")
+                lines.append(f" - {subj} -> {entry}")
+        lines.append("=========================================\n")
+        print("\n".join(lines))
+
+    def find_subject(self, subject_name, pass_name=None):
+        """Stored path of a subject (or one of its passes), None if unknown.
+
+        With a store the lookup is an indexed query, so passes other
+        processes registered are found too; entries added in memory but not
+        saved yet (e.g. inside batch()) are still found here.
+        """
+        if Profile.store is not None:
+            found = Profile.store.find_subject(self.name, subject_name, pass_name)
+            if found is not None:
+                return found
+        entry = self.subjects.get(subject_name)
+        if pass_name and isinstance(entry, dict):
+            return entry.get(pass_name)
+        return None if pass_name else entry
+
+
 
+if os.environ.get("PIPELINE_PROFILE_DB"):
+    from ProfileStore import SqliteProfileStore
+    Profile.use_store(SqliteProfileStore(os.environ["PIPELINE_PROFILE_DB"]))
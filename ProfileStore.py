@@ -0,0 +1,227 @@
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import sqlite3
+
+
+class SqliteProfileStore:
+    """SQLite registry for profiles and their subjects/passes.
+
+    An alternative to one JSON file per profile for studios with thousands
+    of subjects: subjects live in an indexed table, so adding or removing a
+    pass writes one row instead of the whole profile, and several processes
+    can share the database safely (WAL mode + busy timeout).
+
+    Enable it for every Profile with Profile.use_store(SqliteProfileStore(path))
+    or by setting the PIPELINE_PROFILE_DB environment variable. Existing JSON
+    profiles are imported with migrate_from_json().
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS profiles (
+            name TEXT PRIMARY KEY,
+            rules TEXT NOT NULL,
+            notes TEXT NOT NULL DEFAULT '',
+            allow_subsubjects INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS subjects (
+            profile TEXT NOT NULL REFERENCES profiles(name) ON DELETE CASCADE,
+            subject TEXT NOT NULL,
+            pass TEXT NOT NULL DEFAULT '',
+            path TEXT NOT NULL,
+            PRIMARY KEY (profile, subject, pass)
+        );
+        CREATE INDEX IF NOT EXISTS subjects_by_pass ON subjects(profile, pass);
+        CREATE TABLE IF NOT EXISTS pass_counters (
+            profile TEXT NOT NULL REFERENCES profiles(name) ON DELETE CASCADE,
+            subject TEXT NOT NULL,
+            last INTEGER NOT NULL,
+            PRIMARY KEY (profile, subject)
+        );
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _connect(self, immediate=False):
+        # IMMEDIATE takes the write lock up front for read-modify-write transactions
+        conn = sqlite3.connect(str(self.path), timeout=30,
+                               isolation_level="IMMEDIATE" if immediate else "DEFERRED")
+        conn.execute("PRAGMA foreign_keys=ON")
+        try:
+            with conn:  # commit on success, rollback on error
+                yield conn
+        finally:
+            conn.close()
+
+    # ------------------ PROFILES ------------------
+    def list_names(self):
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT name FROM profiles ORDER BY name")]
+
+    def load_data(self, name):
+        """Return the profile as the same dict layout as the JSON files, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT name, rules, notes, allow_subsubjects FROM profiles WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:
+                return None
+            allow_subs = bool(row[3])
+            subjects = {}
+            for subject, pass_name, path in conn.execute(
+                "SELECT subject, pass, path FROM subjects WHERE profile = ? ORDER BY rowid", (name,)
+            ):
+                if pass_name:
+                    subjects.setdefault(subject, {})[pass_name] = path
+                else:
+                    subjects[subject] = path
+            counters = dict(conn.execute("SELECT subject, last FROM pass_counters WHERE profile = ?", (name,)))
+        return {
+            "name": row[0],
+            "rules": json.loads(row[1]),
+            "notes": row[2],
+            "subjects": subjects,
+            "allow_subsubjects": allow_subs,
+            "pass_counters": counters,
+        }
+
+    def save_data(self, data, removed=()):
+        """Write a whole profile (rules, notes and its subjects) in one transaction.
+
+        Subject rows are upserted and pass counters only ever raised, so rows
+        other processes added with put_subject() or allocate_pass() survive.
+        Only the (subject, pass) entries in removed, the ones the caller
+        dropped itself, are deleted; pass None means a passless subject.
+        """
+        name = data["name"]
+        rows = []
+        for subject, entry in data.get("subjects", {}).items():
+            if isinstance(entry, dict):
+                rows.extend((name, subject, p, path) for p, path in entry.items())
+            else:
+                rows.append((name, subject, "", entry))
+        with self._connect(immediate=True) as conn:
+            conn.execute(
+                "INSERT INTO profiles (name, rules, notes, allow_subsubjects) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET rules = excluded.rules, notes = excluded.notes, "
+                "allow_subsubjects = excluded.allow_subsubjects",
+                (name, json.dumps(data.get("rules", {})), data.get("notes", ""),
+                 int(bool(data.get("allow_subsubjects")))),
+            )
+            conn.executemany("DELETE FROM subjects WHERE profile = ? AND subject = ? AND pass = ?",
+                             [(name, subject, pass_name or "") for subject, pass_name in removed])
+            conn.executemany(
+                "INSERT INTO subjects (profile, subject, pass, path) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(profile, subject, pass) DO UPDATE SET path = excluded.path", rows)
+            conn.executemany(
+                "INSERT INTO pass_counters (profile, subject, last) VALUES (?, ?, ?) "
+                "ON CONFLICT(profile, subject) DO UPDATE SET last = MAX(last, excluded.last)",
+                [(name, subject, n) for subject, n in data.get("pass_counters", {}).items()])
+            # a subject removed entirely starts its numbering over, as in delete_subject()
+            conn.executemany(
+                "DELETE FROM pass_counters WHERE profile = ? AND subject = ? AND NOT EXISTS "
+                "(SELECT 1 FROM subjects WHERE profile = ? AND subject = ?)",
+                [(name, subject, name, subject) for subject in {subject for subject, _ in removed}])
+
+    def delete(self, name):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM profiles WHERE name = ?", (name,)).rowcount > 0
+
+    # ------------------ SUBJECTS ------------------
+    def put_subject(self, profile, subject, pass_name, path):
+        """Insert/replace one subject row; returns False if the profile isn't stored yet."""
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM profiles WHERE name = ?", (profile,)).fetchone() is None:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO subjects (profile, subject, pass, path) VALUES (?, ?, ?, ?)",
+                (profile, subject, pass_name or "", path),
+            )
+        return True
+
+    def delete_subject(self, profile, subject, pass_name=None):
+        with self._connect() as conn:
+            if pass_name:
+                conn.execute("DELETE FROM subjects WHERE profile = ? AND subject = ? AND pass = ?",
+                             (profile, subject, pass_name))
+            else:
+                conn.execute("DELETE FROM subjects WHERE profile = ? AND subject = ?", (profile, subject))
+            if conn.execute("SELECT 1 FROM subjects WHERE profile = ? AND subject = ? LIMIT 1",
+                            (profile, subject)).fetchone() is None:
+                conn.execute("DELETE FROM pass_counters WHERE profile = ? AND subject = ?", (profile, subject))
+
+    def allocate_pass(self, profile, subject, floor=0):
+        """Atomically bump and return the subject's pass high-water mark.
+
+        floor is the caller's own idea of the highest pass in use (e.g. from
+        passes registered before counters existed). Falls back to floor + 1
+        when the profile isn't stored yet.
+        """
+        with self._connect(immediate=True) as conn:
+            if conn.execute("SELECT 1 FROM profiles WHERE name = ?", (profile,)).fetchone() is None:
+                return floor + 1
+            conn.execute(
+                "INSERT INTO pass_counters (profile, subject, last) VALUES (?, ?, ?) "
+                "ON CONFLICT(profile, subject) DO UPDATE SET last = MAX(last, ?) + 1",
+                (profile, subject, floor + 1, floor),
+            )
+            return conn.execute("SELECT last FROM pass_counters WHERE profile = ? AND subject = ?",
+                                (profile, subject)).fetchone()[0]
+
+    def note_pass(self, profile, subject, number):
+        """Raise the high-water mark to at least number (explicitly named passes)."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO pass_counters (profile, subject, last) VALUES (?, ?, ?) "
+                "ON CONFLICT(profile, subject) DO UPDATE SET last = MAX(last, excluded.last)",
+                (profile, subject, number),
+            )
+
+    def find_subject(self, profile, subject, pass_name=None):
+        """Indexed lookup of a subject (or one of its passes) without loading the profile.
+
+        Returns the stored path, a {pass: path} dict when pass_name is None and
+        the subject has passes, or None.
+        """
+        with self._connect() as conn:
+            if pass_name:
+                row = conn.execute("SELECT path FROM subjects WHERE profile = ? AND subject = ? AND pass = ?",
+                                   (profile, subject, pass_name)).fetchone()
+                return row[0] if row else None
+            rows = conn.execute("SELECT pass, path FROM subjects WHERE profile = ? AND subject = ? ORDER BY rowid",
+                                (profile, subject)).fetchall()
+        if not rows:
+            return None
+        if len(rows) == 1 and not rows[0][0]:
+            return rows[0][1]
+        return {p: path for p, path in rows}
+
+    # ------------------ MIGRATION ------------------
+    def migrate_from_json(self, folder):
+        """Import every <folder>/*.json profile; returns the imported names."""
+        imported = []
+        for path in sorted(Path(folder).glob("*.json")):
+            with open(path, "r") as f:
+                data = json.load(f)
+            data.setdefault("name", path.stem)
+            self.save_data(data)
+            imported.append(data["name"])
+        return imported
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migrate JSON profiles into a SQLite profile registry.")
+    parser.add_argument("database", help="path of the SQLite file to create or update")
+    parser.add_argument("--from", dest="folder", default=str(Path(__file__).parent / "profiles"),
+                        help="folder containing the JSON profiles (default: ./profiles)")
+    args = parser.parse_args()
+    names = SqliteProfileStore(args.database).migrate_from_json(args.folder)
+    print(f"Migrated {len(names)} profiles into {args.database}: {', '.join(names)}")
@@ -0,0 +1,269 @@
+from datetime import datetime
+import re
+import time
+
+# keys a predicate rule (a dict inside a category's rule list) may use
+PREDICATE_KEYS = ("glob", "regex", "extensions", "min_size", "max_size", "modified_before", "modified_after")
+
+SIZE_PATTERN = re.compile(r"\s*(\d+(?:\.\d+)?)\s*([kmgt]?)(?:i?b)?\s*", re.IGNORECASE)
+AGE_PATTERN = re.compile(r"\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*")
+AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+# '(?i)' style flags at the start of a regex rule; they only work at the very
+# start of a pattern, so they are turned into a scoped '(?i:...)' group
+GLOBAL_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+
+def parse_size(value):
+    """Bytes for 2048, '500MB', '2GB' or '1.5 GiB' (binary units, like --large-file-mb)."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = SIZE_PATTERN.fullmatch(str(value))
+    if not match:
+        raise ValueError(f"Invalid size '{value}' (expected e.g. 2GB, 500MB or a byte count)")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " kmgt".index(unit.lower() or " "))
+
+
+def parse_time(value, now, pass_time=None):
+    """Epoch seconds for 'pass', a relative age ('30d', '12h', '2w') or an ISO date/time."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if value == "pass":
+        return now if pass_time is None else pass_time
+    match = AGE_PATTERN.fullmatch(value)
+    if match:
+        return now - float(match.group(1)) * AGE_UNITS[match.group(2)]
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}' (expected 'pass', an age like '30d' or a date like 2024-06-01)")
+
+
+def _as_timestamp(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+
+def glob_to_regex(pattern):
+    """Regex for a shell-style name pattern ('*', '?', '[...]'), without groups so patterns can be merged."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == "*":
+            out.append(".*")
+        elif c == "?":
+            out.append(".")
+        elif c == "[":
+            j = i
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            j = pattern.find("]", j)
+            if j == -1:
+                out.append(r"\[")
+                continue
+            body = pattern[i:j].replace("\\", "\\\\")
+            if body[:1] in "!^":
+                body = "^" + body[1:]
+            out.append(f"[{body}]")
+            i = j + 1
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+
+def _listed(value):
+    return [value] if isinstance(value, str) else list(value)
+
+
+class PredicateRule:
+    """One ordered rule: a name pattern plus optional size/date bounds -> category."""
+
+    __slots__ = ("category", "order", "spec", "pattern", "name", "min_size", "max_size", "before", "after")
+
+    def __init__(self, category, order, spec):
+        unknown = set(spec) - set(PREDICATE_KEYS)
+        if unknown:
+            raise ValueError(f"Rule for '{category}' has unknown keys: {', '.join(sorted(unknown))} "
+                             f"(allowed: {', '.join(PREDICATE_KEYS)})")
+        if not spec:
+            raise ValueError(f"Rule for '{category}' is empty; use {{\"glob\": \"*\"}} to match everything")
+        self.category = category
+        self.order = order
+        self.spec = spec
+        # every name condition becomes a lookahead at the start of the name, so
+        # they combine as AND and the rule stays a single zero-width pattern
+        parts = []
+        if "glob" in spec:
+            parts.append("(?=(?:%s)\\Z)" % "|".join(glob_to_regex(g) for g in _listed(spec["glob"])))
+        if "regex" in spec:
+            regex = spec["regex"]
+            if "(?P" in regex or re.search(r"\\\d", regex):
+                # the rule is merged with others into one regex, where group names and numbers change
+                raise ValueError(f"Rule for '{category}': regex rules can't use named groups or backreferences")
+            flags = GLOBAL_FLAGS.match(regex)
+            if flags:
+                regex = f"(?{flags.group(1)}:{regex[flags.end():]})"
+            parts.append(f"(?=.*?(?:{regex}))")
+        if "extensions" in spec:
+            exts = [e if e.startswith(".") else f".{e}" for e in _listed(spec["extensions"])]
+            parts.append("(?=.*(?:%s)\\Z)" % "|".join(re.escape(e) for e in exts))
+        self.pattern = "".join(parts) or None
+        try:
+            # compile the rule as it will sit in the merged regex, so any error surfaces here
+            self.name = re.compile(self.pattern, re.IGNORECASE | re.DOTALL) if self.pattern else None
+        except re.error as e:
+            raise ValueError(f"Rule for '{category}' has an invalid pattern: {e}")
+        self.min_size = parse_size(spec["min_size"]) if "min_size" in spec else None
+        self.max_size = parse_size(spec["max_size"]) if "max_size" in spec else None
+        self.before = spec.get("modified_before")
+        self.after = spec.get("modified_after")
+        # fail on bad dates when the profile is compiled, not halfway through a run
+        for value in (self.before, self.after):
+            if value is not None:
+                parse_time(value, time.time())
+
+    @property
+    def uses_stat(self):
+        return (self.min_size is not None or self.max_size is not None
+                or self.before is not None or self.after is not None)
+
+    def bounds(self, now, pass_time):
+        """(min size, max size, mtime upper bound, mtime lower bound) with dates resolved."""
+        return (self.min_size, self.max_size,
+                parse_time(self.before, now, pass_time) if self.before is not None else None,
+                parse_time(self.after, now, pass_time) if self.after is not None else None)
+
+
+class RuleIndex:
+    """Category lookup compiled once from a profile's rules.
+
+    A category's rule list holds extensions ('.exr') and, optionally,
+    predicate rules as dicts:
+
+        "Textures/Diffuse": [{"glob": "*_diffuse*.png"}],
+        "Caches": [{"min_size": "2GB"}],
+        "Archive": [{"modified_before": "pass"}],
+
+    Predicate rules are tried first, in rule order (category order, then
+    list order); all keys of one rule must hold. Names match
+    case-insensitively. modified_before/after take 'pass' (when the pass
+    was created), an age ('30d') or an ISO date. Files no predicate rule
+    takes fall back to the extension lookup.
+
+    Extensions may be compound (e.g. '.tar.gz', '.bgeo.sc'); the longest
+    matching suffix wins and, for the same suffix, the first category in
+    rule order wins (same as the old linear scan).
+
+    All rules that only look at the name are merged into one regex, so a
+    name costs one match call however many there are; rules with size or
+    date bounds are checked with plain comparisons on the file's stat.
+    """
+
+    def __init__(self, rules):
+        self.extensions = {}
+        self.max_parts = 1
+        self.rules = []
+        for category, entries in rules.items():
+            for entry in entries:
+                if isinstance(entry, dict):
+                    self.rules.append(PredicateRule(category, len(self.rules), entry))
+                    continue
+                ext = (entry if entry.startswith('.') else f".{entry}").lower()
+                self.extensions.setdefault(ext, category)
+                self.max_parts = max(self.max_parts, ext.count('.'))
+        self._stat_rules = [rule for rule in self.rules if rule.uses_stat]
+        name_rules = [rule for rule in self.rules if not rule.uses_stat]
+        self._by_group = {f"r{rule.order}": rule for rule in name_rules}
+        self._names = None
+        if name_rules:
+            self._names = re.compile("|".join(f"(?P<r{rule.order}>{rule.pattern})" for rule in name_rules),
+                                     re.IGNORECASE | re.DOTALL)
+        # stat() is needed to classify at all only when some rule reads it
+        self.needs_stat = bool(self._stat_rules)
+
+    def get(self, file_extension, default=None):
+        """Category for a single suffix such as Path.suffix ('.EXR' -> 'Renders')."""
+        return self.extensions.get(file_extension.lower(), default)
+
+    def by_extension(self, filename, default="Others"):
+        """Category for a file name from the extension rules alone, compound suffixes longest first."""
+        name = filename.lower()
+        # leading dots belong to the name ('.bashrc' has no suffix, like Path.suffix)
+        start = len(name) - len(name.lstrip('.'))
+        if name.endswith('.'):
+            return default
+        candidates = []
+        pos = len(name)
+        for _ in range(self.max_parts):
+            pos = name.rfind('.', start + 1, pos)
+            if pos == -1:
+                break
+            candidates.append(pos)
+        for pos in reversed(candidates):
+            category = self.extensions.get(name[pos:])
+            if category is not None:
+                return category
+        return default
+
+    def matcher(self, pass_time=None, now=None):
+        """A classify(filename, st=None, default='Others') function for one run.
+
+        Date bounds are resolved once here: ages against now, 'pass' against
+        pass_time (epoch seconds, datetime or ISO string; defaults to now).
+        Without st, rules with size or date bounds never match.
+        """
+        if not self.rules:
+            return lambda filename, st=None, default="Others": self.by_extension(filename, default)
+        now = time.time() if now is None else now
+        pass_time = _as_timestamp(pass_time)
+        stat_checks = [(rule.order, rule.name, rule.category) + rule.bounds(now, pass_time)
+                       for rule in self._stat_rules]
+        names = self._names
+        by_group = self._by_group
+        by_extension = self.by_extension
+
+        def classify(filename, st=None, default="Others"):
+            found = None
+            if names is not None:
+                match = names.match(filename)
+                if match is not None:
+                    found = by_group[match.lastgroup]
+            if st is not None:
+                for order, name, category, min_size, max_size, before, after in stat_checks:
+                    if found is not None and order > found.order:
+                        break
+                    size = st.st_size
+                    if min_size is not None and size < min_size:
+                        continue
+                    if max_size is not None and size > max_size:
+                        continue
+                    if before is not None and st.st_mtime >= before:
+                        continue
+                    if after is not None and st.st_mtime < after:
+                        continue
+                    if name is None or name.match(filename):
+                        return category
+            if found is not None:
+                return found.category
+            return by_extension(filename, default)
+
+        return classify
+
+    def classify(self, filename, default="Others", st=None, pass_time=None):
+        """Category for a file name (and its stat, for size/date rules).
+
+        For many files, call matcher() once and use the function it returns.
+        """
+        if not self.rules:
+            return self.by_extension(filename, default)
+        return self.matcher(pass_time)(filename, st, default)
+
+    def __len__(self):
+        return len(self.extensions)
@@ -0,0 +1,66 @@
+import fnmatch
+import os
+import re
+
+
+class SourceScanner:
+    """Streams the files of a source folder as os.DirEntry objects.
+
+    Built on os.scandir so the file/dir type comes from the cached dirent
+    data instead of an extra stat per entry. Directories are walked
+    depth-first and entries are yielded as soon as they are read, so
+    callers can start working before the scan finishes.
+
+    include/exclude are glob patterns matched against both the entry name
+    and its path relative to the root ('renders/*.exr'). Excluded
+    directories are not descended into. max_depth=0 means the top level
+    only; recursive=False is the same as max_depth=0. Directories listed in
+    prune (absolute paths) are skipped, e.g. a destination inside the source.
+    """
+
+    def __init__(self, root, recursive=False, include=None, exclude=None, max_depth=None, prune=None):
+        self.root = os.fspath(root)
+        self.prune = {os.path.abspath(p) for p in (prune or ())}
+        self.max_depth = max_depth if recursive else 0
+        self.include = self._compile(include)
+        self.exclude = self._compile(exclude)
+
+    @staticmethod
+    def _compile(patterns):
+        if not patterns:
+            return None
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns))
+
+    @staticmethod
+    def _matches(regex, name, rel):
+        return regex.match(name) is not None or regex.match(rel) is not None
+
+    def __iter__(self):
+        stack = [(self.root, "", 0)]
+        while stack:
+            path, rel_dir, depth = stack.pop()
+            subdirs = []
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        rel = f"{rel_dir}{entry.name}"
+                        if self.exclude is not None and self._matches(self.exclude, entry.name, rel):
+                            continue
+                        try:
+                            if entry.is_file():
+                                if self.include is None or self._matches(self.include, entry.name, rel):
+                                    yield entry
+                            elif entry.is_dir(follow_symlinks=False):
+                                if self.max_depth is not None and depth >= self.max_depth:
+                                    continue
+                                if os.path.abspath(entry.path) not in self.prune:
+                                    subdirs.append((entry.path, f"{rel}/", depth + 1))
+                        except OSError:
+                            continue
+            except OSError as e:
+                print(f"Cannot scan '{path}': {e}")
+                continue
+            # reversed so siblings are visited in the order scandir returned them
+            stack.extend(reversed(subdirs))
@@ -0,0 +1,161 @@
+import os
+import re
+
+# 'shot_v001.1001.exr', 'plate_0042.dpx', 'sim.0100.bgeo.sc': a frame number
+# between a '.'/'_' separator and the extension(s)
+FRAME_PATTERN = re.compile(r"^(?P<head>.*?[._])(?P<frame>\d+)(?P<tail>(?:\.[A-Za-z][A-Za-z0-9]*)+)$")
+
+# gaps listed individually in a report before they are only counted
+MAX_LISTED_GAPS = 5
+
+
+def split_frame(name):
+    """(head, frame digits, tail) for a frame file name, or None."""
+    match = FRAME_PATTERN.match(name)
+    return match.group("head", "frame", "tail") if match else None
+
+
+def frame_ranges(frames):
+    """Collapse frame numbers into sorted [first, last] runs."""
+    frames = sorted(set(frames))
+    ranges = []
+    for frame in frames:
+        if ranges and frame == ranges[-1][1] + 1:
+            ranges[-1][1] = frame
+        else:
+            ranges.append([frame, frame])
+    return ranges
+
+
+def merge_ranges(a, b):
+    """Union of two [first, last] run lists."""
+    merged = []
+    for first, last in sorted([list(r) for r in a] + [list(r) for r in b]):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+
+def _span(first, last):
+    return str(first) if first == last else f"{first}-{last}"
+
+
+def format_ranges(ranges):
+    """'1001-1240, missing 1100' style report for a run list."""
+    if not ranges:
+        return "no frames"
+    text = _span(ranges[0][0], ranges[-1][1])
+    gaps = [(prev[1] + 1, cur[0] - 1) for prev, cur in zip(ranges, ranges[1:])]
+    if gaps:
+        listed = ", ".join(_span(first, last) for first, last in gaps[:MAX_LISTED_GAPS])
+        more = len(gaps) - MAX_LISTED_GAPS
+        text += f", missing {listed}" + (f" (+{more} more gaps)" if more > 0 else "")
+    return text
+
+
+def frame_count(ranges):
+    return sum(last - first + 1 for first, last in ranges)
+
+
+def sequence_pattern(head, padding, tail):
+    return f"{head}{'#' * padding}{tail}"
+
+
+def sequences_in(names):
+    """{pattern: runs} for every sequence (2+ frames) among file names.
+
+    One regex match per name, so this is linear in the number of names.
+    """
+    groups = {}
+    for name in names:
+        parts = split_frame(name)
+        if parts is None:
+            continue
+        head, digits, tail = parts
+        group = groups.setdefault((head, tail), [len(digits), []])
+        group[0] = min(group[0], len(digits))
+        group[1].append(int(digits))
+    return {sequence_pattern(head, padding, tail): frame_ranges(frames)
+            for (head, tail), (padding, frames) in groups.items() if len(frames) > 1}
+
+
+class ImageSequence:
+    """Frames of one 'name.####.ext' sequence found in a source folder."""
+
+    __slots__ = ("folder", "head", "tail", "padding", "items")
+
+    def __init__(self, folder, head, tail):
+        self.folder = folder
+        self.head = head
+        self.tail = tail
+        self.padding = None
+        # (frame number, PlannedFile)
+        self.items = []
+
+    def add(self, frame, item):
+        self.padding = len(frame) if self.padding is None else min(self.padding, len(frame))
+        self.items.append((int(frame), item))
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def pattern(self):
+        return sequence_pattern(self.head, self.padding, self.tail)
+
+    @property
+    def ranges(self):
+        return frame_ranges(frame for frame, _ in self.items)
+
+    def report(self):
+        return f"{self.pattern}: {len(self)} frames, {format_ranges(self.ranges)}"
+
+
+class SequenceDetector:
+    """Groups the frames of image sequences in a stream of PlannedFiles.
+
+    Files that are not frames pass straight through. Frames are held until
+    the scan leaves their folder (SourceScanner lists each folder's files
+    together), then every sequence of min_frames or more is yielded as one
+    contiguous block in frame order, with the category of its first frame
+    applied to all of them. Sequences found are kept in self.sequences.
+    """
+
+    def __init__(self, min_frames=2):
+        self.min_frames = min_frames
+        self.sequences = []
+
+    def _flush(self, groups):
+        for sequence in groups.values():
+            if len(sequence) < self.min_frames:
+                for _, item in sequence.items:
+                    yield item
+                continue
+            sequence.items.sort(key=lambda frame_item: frame_item[0])
+            category = sequence.items[0][1].category
+            for _, item in sequence.items:
+                item.category = category
+                yield item
+            self.sequences.append(sequence)
+        groups.clear()
+
+    def group(self, items):
+        groups = {}
+        folder = None
+        for item in items:
+            parent = os.path.dirname(item.source)
+            if parent != folder:
+                yield from self._flush(groups)
+                folder = parent
+            parts = split_frame(item.name)
+            if parts is None:
+                yield item
+                continue
+            head, frame, tail = parts
+            sequence = groups.get((head, tail))
+            if sequence is None:
+                sequence = groups[(head, tail)] = ImageSequence(parent, head, tail)
+            sequence.add(frame, item)
+        yield from self._flush(groups)
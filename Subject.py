@@ -1,6 +1,8 @@
 from pathlib import Path
 from datetime import datetime
+import json
 import shutil
+import time
 
 class Subject:
     def __init__(self, name, destination_root, profile, pass_name=None):
@@ -16,12 +18,44 @@ class Subject:
         self.notes = profile.notes
         self.created_at = datetime.now().isoformat()
 
+    # records when the pass (or subject) folder was first created
+    PASS_INFO = ".organizer_pass.json"
+
     def create(self):
         self.destination_path.mkdir(parents=True, exist_ok=True)
         for folder in self.folders:
-            (self.destination_path / folder).mkdir(exist_ok=True)
+            # predicate rules may target nested folders ('Textures/Diffuse')
+            (self.destination_path / folder).mkdir(parents=True, exist_ok=True)
+        self.created_timestamp()
         print(f" Subject '{self.name}' created at '{self.destination_path}'")
 
+    def created_timestamp(self):
+        """Epoch seconds at which the pass folder was first created, or None if it doesn't exist.
+
+        Kept in a small sidecar written once (exclusive create) by the first
+        create(), so re-runs and resumed jobs see the same value. Folders
+        made before the sidecar existed get one on first use.
+        """
+        path = self.destination_path / self.PASS_INFO
+        try:
+            with open(path, "r") as f:
+                return float(json.load(f)["created"])
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable pass info '{path}': {e}")
+            return None
+        if not self.destination_path.is_dir():
+            return None
+        created = time.time()
+        try:
+            with open(path, "x") as f:
+                json.dump({"created": created}, f)
+        except FileExistsError:
+            # another run created the pass at the same moment; use its time
+            return self.created_timestamp()
+        return created
+
     def delete(self):
         if self.destination_path.exists() and self.destination_path.is_dir():
             shutil.rmtree(self.destination_path)
@@ -0,0 +1,146 @@
+from pathlib import Path
+import json
+import os
+
+from AtomicFile import file_lock, write_json
+from Sequences import merge_ranges, sequences_in
+
+
+class SubjectStats:
+    """Cached per-category file counts and byte totals for a pass folder.
+
+    Stored as '.organizer_stats.json' next to the category folders. Organize
+    runs update it with what they placed, so summaries don't have to list
+    every folder. Each category also remembers its folder's mtime; a rescan
+    only re-lists folders whose mtime changed since they were counted.
+    Folder mtimes change when entries are added, removed or renamed, not
+    when a file's contents are rewritten in place, so byte totals for files
+    edited outside the organizer are only refreshed by a forced rescan.
+    Writes re-read the file under '.organizer_stats.lock', so concurrent
+    runs into the same pass don't overwrite each other's numbers.
+    Image sequences in a category are kept as frame runs per pattern
+    ('shot.####.exr': [[1001, 1099], [1101, 1240]]).
+    """
+
+    FILENAME = ".organizer_stats.json"
+    LOCKNAME = ".organizer_stats.lock"
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self.path = self.folder / self.FILENAME
+        self.categories = {}
+        # new/updated/skipped counts of the last incremental run
+        self.last_run = {}
+        # category folder mtimes when the current run started, see start_run()
+        self._start_mtimes = {}
+        self._load()
+
+    def _load(self):
+        self.categories = {}
+        self.last_run = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                self.categories = data.get("categories", {})
+                self.last_run = data.get("last_run", {})
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable stats file '{self.path}': {e}")
+
+    def _dir_mtime(self, category):
+        try:
+            return os.stat(self.folder / category).st_mtime_ns
+        except OSError:
+            return None
+
+    def scan_category(self, category):
+        files = total = 0
+        names = []
+        try:
+            with os.scandir(self.folder / category) as it:
+                for entry in it:
+                    if entry.is_file():
+                        files += 1
+                        total += entry.stat().st_size
+                        names.append(entry.name)
+        except OSError:
+            pass
+        self.categories[category] = {"files": files, "bytes": total, "mtime_ns": self._dir_mtime(category)}
+        sequences = sequences_in(names)
+        if sequences:
+            self.categories[category]["sequences"] = sequences
+        return self.categories[category]
+
+    def start_run(self):
+        """Remember the cached category folders' mtimes before an organize run writes to them."""
+        self._start_mtimes = {category: self._dir_mtime(category) for category in self.categories}
+
+    def apply_run(self, changes, last_run=None, sequences=None):
+        """Fold an organize run's {category: (added files, byte delta)} into the sidecar.
+
+        The sidecar is re-read under the lock first. Deltas are only added
+        to a category still cached at the folder mtime start_run() saw;
+        if the folder changed any other way since (files edited by hand,
+        another run), it is counted again instead. sequences ({category:
+        {pattern: frame runs}}) are merged into the frame runs recorded.
+        """
+        if not self.folder.exists():
+            return
+        with file_lock(self.folder / self.LOCKNAME):
+            self._load()
+            if last_run is not None:
+                self.last_run = last_run
+            for category, (added, delta) in changes.items():
+                cached = self.categories.get(category)
+                start = self._start_mtimes.get(category)
+                if cached is None or start is None or cached.get("mtime_ns") != start:
+                    self.scan_category(category)
+                    continue
+                cached["files"] += added
+                cached["bytes"] += delta
+                cached["mtime_ns"] = self._dir_mtime(category)
+                for pattern, ranges in (sequences or {}).get(category, {}).items():
+                    known = cached.setdefault("sequences", {})
+                    known[pattern] = merge_ranges(known.get(pattern, []), ranges)
+            self.save()
+
+    def refresh(self, rescan=False, force=False):
+        """Return {category: {'files', 'bytes'[, 'sequences']}} for every category folder.
+
+        Folders without cached numbers are always counted. With rescan=True,
+        folders whose mtime changed since they were counted are re-listed;
+        force=True re-lists everything.
+        """
+        scanned = {}
+        seen = set()
+        try:
+            with os.scandir(self.folder) as it:
+                folders = [e.name for e in it if e.is_dir()]
+        except OSError:
+            folders = []
+        # nested categories ('Textures/Diffuse') are counted on their own
+        folders += [c for c in self.categories if "/" in c and (self.folder / c).is_dir()]
+        for category in folders:
+            seen.add(category)
+            cached = self.categories.get(category)
+            if (cached is None or force
+                    or (rescan and cached.get("mtime_ns") != self._dir_mtime(category))):
+                scanned[category] = self.scan_category(category)
+        removed = set(self.categories) - seen
+        for category in removed:
+            del self.categories[category]
+        if (scanned or removed) and self.folder.exists():
+            with file_lock(self.folder / self.LOCKNAME):
+                # keep what other runs recorded meanwhile; only our counts are newer
+                self._load()
+                self.categories.update(scanned)
+                for category in removed:
+                    self.categories.pop(category, None)
+                self.save()
+        return {c: {k: v[k] for k in ("files", "bytes", "sequences") if k in v}
+                for c, v in self.categories.items()}
+
+    def save(self):
+        if not self.folder.exists():
+            return
+        write_json(self.path, {"categories": self.categories, "last_run": self.last_run})
@@ -0,0 +1,296 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import asyncio
+import errno
+import os
+import shutil
+import stat
+import time
+
+from Checksums import ChecksumMismatch, HashingCopy
+from Manifest import file_digest
+
+# names a copy_function may return to say how it placed the file, alone or as
+# (name, bytes copied); any other return value is ignored and the function's
+# name is recorded instead
+METHODS = {"rename", "copy+unlink", "reflinked", "hardlinked", "copied",
+           "copy_file_range", "sendfile", "chunked", "batched"}
+
+LARGE_FILE_CHUNK = 8 * 1024 * 1024
+
+
+class TransferResult:
+    """Outcome of a single file transfer."""
+
+    __slots__ = ("source", "destination", "category", "ok", "error", "seconds", "size", "method")
+
+    def __init__(self, source, destination, category, ok=True, error=None, seconds=0.0, size=0, method=None):
+        self.source = source
+        self.destination = destination
+        self.category = category
+        self.ok = ok
+        self.error = error
+        self.seconds = seconds
+        self.size = size
+        self.method = method
+
+    def __repr__(self):
+        state = "ok" if self.ok else f"failed: {self.error}"
+        return f"TransferResult({self.source!r} -> {self.destination!r}, {self.method}, {state})"
+
+
+def large_file_copy(source, destination, chunk_size=LARGE_FILE_CHUNK):
+    """Copy one big file with the cheapest kernel path available, then its metadata.
+
+    Tries os.copy_file_range (in-kernel, and server-side/reflink on
+    filesystems that support it), then os.sendfile, then a chunked
+    readinto loop with a large reusable buffer. Permission bits and
+    timestamps are applied once at the end with shutil.copystat, like copy2.
+    Returns the name of the path taken and the number of bytes copied.
+    """
+    with open(source, "rb") as fsrc, open(destination, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        method = None
+        for name in ("copy_file_range", "sendfile"):
+            func = getattr(os, name, None)
+            if func is None:
+                continue
+            try:
+                offset = 0
+                while offset < size:
+                    if name == "copy_file_range":
+                        sent = func(fsrc.fileno(), fdst.fileno(), min(chunk_size * 16, size - offset))
+                    else:
+                        sent = func(fdst.fileno(), fsrc.fileno(), offset, min(chunk_size * 16, size - offset))
+                    if sent == 0:
+                        break
+                    offset += sent
+            except OSError as e:
+                if offset or e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                                             errno.ENOTSOCK, errno.EBADF):
+                    raise
+                continue
+            method = name
+            break
+        if method is None:
+            buf = bytearray(chunk_size)
+            view = memoryview(buf)
+            while True:
+                n = fsrc.readinto(buf)
+                if not n:
+                    break
+                fdst.write(view[:n])
+            method = "chunked"
+    shutil.copystat(source, destination)
+    return method, size
+
+
+class SizeRouter:
+    """copy_function that sends files >= threshold bytes to large_file_copy."""
+
+    def __init__(self, threshold, small=shutil.copy2, large=large_file_copy):
+        self.threshold = threshold
+        self.small = small
+        self.large = large
+        self.__name__ = getattr(small, "__name__", "copy")
+
+    def __call__(self, source, destination):
+        if os.stat(source).st_size >= self.threshold:
+            return self.large(source, destination)
+        return self.small(source, destination)
+
+
+class TransferEngine:
+    """Runs copy_function over (source, destination, category[, size]) jobs.
+
+    With workers > 1 the jobs run on a thread pool; results are always
+    yielded in submission order so counts and logs stay deterministic.
+    At most workers * 4 transfers are in flight, so the job iterable can be
+    a lazy generator of any length.
+    """
+
+    def __init__(self, copy_function=shutil.copy2, workers=1):
+        self.copy_function = copy_function
+        self.workers = max(1, int(workers or 1))
+        self.default_method = getattr(copy_function, "__name__", "copy")
+
+    def _transfer(self, source, destination, category, size=0):
+        """Run one job; a size of None (source not statted) is filled in from the transfer."""
+        start = time.perf_counter()
+        try:
+            ret = self.copy_function(str(source), str(destination))
+            if isinstance(ret, tuple):
+                ret, copied = ret
+                if size is None:
+                    size = copied
+            if size is None:
+                # the placed file's inode is still cached, unlike the source's
+                size = os.stat(destination).st_size
+        except Exception as e:
+            return TransferResult(source, destination, category, False, e, time.perf_counter() - start, size or 0,
+                                  self.default_method)
+        method = ret if isinstance(ret, str) and ret in METHODS else self.default_method
+        return TransferResult(source, destination, category, True, None, time.perf_counter() - start, size,
+                              method)
+
+    def run(self, jobs):
+        if self.workers == 1:
+            for job in jobs:
+                yield self._transfer(*job)
+            return
+
+        window = self.workers * 4
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for job in jobs:
+                pending.append(pool.submit(self._transfer, *job))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+class SmallFileBatchEngine(TransferEngine):
+    """TransferEngine tuned for folders of many tiny files.
+
+    Jobs are taken in batches of batch_size, grouped by destination folder
+    and cut into chunks of chunk_size files. An asyncio scheduler hands the
+    chunks to the thread pool, so one task covers many files and reads in
+    one chunk overlap writes in others. Each small file is copied at the
+    file-descriptor level (open, fstat, read, write, utime), which is far
+    fewer syscalls than copy2's copyfile + copystat. Files bigger than
+    small_limit, or that fail on the fast path, go through copy_function.
+    Results are still yielded in submission order.
+    """
+
+    def __init__(self, copy_function=shutil.copy2, workers=8, small_limit=1024 * 1024,
+                 batch_size=2048, chunk_size=64):
+        super().__init__(copy_function, workers)
+        self.small_limit = small_limit
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+
+    def _small_copy(self, source, destination):
+        """Copy source if it is small; returns its size, or None if it is too big."""
+        fd = os.open(source, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            st = os.fstat(fd)
+            if st.st_size > self.small_limit:
+                return None
+            data = os.read(fd, st.st_size + 1)
+        finally:
+            os.close(fd)
+        mode = stat.S_IMODE(st.st_mode)
+        fd = os.open(destination, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), mode)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            if hasattr(os, "fchmod"):
+                os.fchmod(fd, mode)  # O_CREAT's mode only applies to new files
+        finally:
+            os.close(fd)
+        if not hasattr(os, "fchmod"):
+            os.chmod(destination, mode)
+        os.utime(destination, ns=(st.st_atime_ns, st.st_mtime_ns))
+        return len(data)
+
+    def _copy_chunk(self, chunk):
+        results = []
+        for index, job in chunk:
+            source, destination, category = job[:3]
+            start = time.perf_counter()
+            try:
+                size = self._small_copy(str(source), str(destination))
+            except Exception:
+                size = None
+            if size is None:
+                results.append((index, self._transfer(*job)))
+            else:
+                results.append((index, TransferResult(source, destination, category, True, None,
+                                                      time.perf_counter() - start, size, "batched")))
+        return results
+
+    async def _run_batch(self, pool, batch):
+        loop = asyncio.get_running_loop()
+        # group files per destination folder so directory updates stay local
+        order = sorted(range(len(batch)), key=lambda i: os.path.dirname(str(batch[i][1])))
+        chunks = [[(i, batch[i]) for i in order[n:n + self.chunk_size]]
+                  for n in range(0, len(order), self.chunk_size)]
+        ordered = [None] * len(batch)
+        for done in asyncio.as_completed([loop.run_in_executor(pool, self._copy_chunk, c) for c in chunks]):
+            for index, result in await done:
+                ordered[index] = result
+        return ordered
+
+    def run(self, jobs):
+        jobs = iter(jobs)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                batch = list(islice(jobs, self.batch_size))
+                if not batch:
+                    return
+                yield from asyncio.run(self._run_batch(pool, batch))
+
+
+class MovePlanner:
+    """Chooses how to move files from a source tree into a destination.
+
+    When source and destination are on the same device the whole batch is
+    done with os.rename (a metadata-only operation). Otherwise each file is
+    copied with copy2, checked for size and only then unlinked from the
+    source; those copies run on the usual thread pool. A rename that still
+    fails with EXDEV (e.g. a mount point inside the source) falls back to
+    the copy path for that file.
+
+    With verify ('record' or 'full') the source is hashed while it is
+    copied and its digest kept in self.digests; 'full' also hashes the
+    copy and unlinks the source only if both digests match (those sources
+    are listed in self.checked). Otherwise the source would be gone
+    before anything could compare it with the destination.
+    """
+
+    def __init__(self, source_root, destination_root, copy=shutil.copy2, verify=None):
+        self.same_device = os.stat(source_root).st_dev == os.stat(destination_root).st_dev
+        if verify and copy is shutil.copy2:
+            copy = HashingCopy()
+        self.copy = copy
+        self.verify = verify
+        # source -> BLAKE2b digest taken before the source was unlinked
+        self.digests = {}
+        self.checked = set()
+
+    def copy_verify_unlink(self, source, destination):
+        size = os.stat(source).st_size
+        self.copy(source, destination)
+        copied = os.stat(destination).st_size
+        if copied != size:
+            os.remove(destination)
+            raise OSError(f"size mismatch after copy ({copied} of {size} bytes); source kept")
+        if self.verify:
+            hashed = getattr(self.copy, "digests", {})
+            digest = hashed.pop(str(source), None) or file_digest(source)
+            if self.verify == "full":
+                if file_digest(destination) != digest:
+                    os.remove(destination)
+                    raise ChecksumMismatch("checksum mismatch after copy; source kept")
+                self.checked.add(str(source))
+            self.digests[str(source)] = digest
+        os.remove(source)
+        return "copy+unlink"
+
+    def rename(self, source, destination):
+        try:
+            os.replace(source, destination)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            return self.copy_verify_unlink(source, destination)
+        return "rename"
+
+    def move_function(self):
+        return self.rename if self.same_device else self.copy_verify_unlink
+
+    def describe(self):
+        return "same device: renaming" if self.same_device else "cross-device: copy, verify, unlink"
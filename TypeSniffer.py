@@ -0,0 +1,157 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import json
+import os
+import re
+
+from AtomicFile import write_json
+
+SNIFF_BYTES = 512
+
+# (extension, signature regex anchored at offset 0), first match wins
+SIGNATURES = (
+    (".exr", rb"\x76\x2f\x31\x01"),
+    (".png", rb"\x89PNG\r\n\x1a\n"),
+    (".jpg", rb"\xff\xd8\xff"),
+    (".tif", rb"II\x2a\x00|MM\x00\x2a|II\x2b\x00|MM\x00\x2b"),
+    (".psd", rb"8BPS"),
+    (".gif", rb"GIF8[79]a"),
+    (".webp", rb"RIFF....WEBP"),
+    (".wav", rb"RIFF....WAVE"),
+    (".hdr", rb"#\?(?:RADIANCE|RGBE)"),
+    (".dds", rb"DDS "),
+    (".fbx", rb"Kaydara FBX Binary|; FBX "),
+    (".abc", rb"Ogawa"),
+    (".blend", rb"BLENDER"),
+    (".mb", rb"FOR[48].{4,12}?Maya"),
+    (".ma", rb"//Maya ASCII"),
+    (".mov", rb"....ftypqt  |....(?:moov|mdat|wide)"),
+    (".mp4", rb"....ftyp"),
+    (".pdf", rb"%PDF-"),
+    (".zip", rb"PK\x03\x04"),
+)
+
+# other spellings of a sniffed type that a profile's rules may use instead
+ALIASES = {".tif": (".tiff",), ".jpg": (".jpeg",), ".mp4": (".m4v",), ".mov": (".qt",), ".hdr": (".pic",)}
+
+# one alternation with a named group per signature: a single match() per file
+_GROUPS = {f"t{i}": ext for i, (ext, _) in enumerate(SIGNATURES)}
+_MAGIC = re.compile(b"|".join(b"(?P<t%d>%s)" % (i, sig) for i, (_, sig) in enumerate(SIGNATURES)), re.DOTALL)
+
+SNIFF_MODES = ("unknown", "all")
+
+
+def sniff_bytes(head):
+    """Extension implied by a file's first bytes (e.g. '.exr'), or None."""
+    match = _MAGIC.match(head)
+    return _GROUPS[match.lastgroup] if match else None
+
+
+class TypeSniffer:
+    """Classifies files by content (magic bytes) when the name isn't enough.
+
+    mode 'unknown' only looks at files whose name classifies as 'Others'
+    (extensionless or unknown suffix); 'all' also checks named files and
+    moves mislabelled ones (a PNG saved as '.exr') to the category of
+    their real type. Only the first SNIFF_BYTES bytes are read.
+
+    Results are cached by (device, inode, mtime) in a JSON file, so files
+    that haven't changed are not opened again on later runs.
+    """
+
+    def __init__(self, rule_index, mode="unknown", workers=8, cache_path=None):
+        if mode not in SNIFF_MODES:
+            raise ValueError(f"sniff mode must be one of {', '.join(SNIFF_MODES)}")
+        self.rule_index = rule_index
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.cache_path = Path(cache_path) if cache_path else Path(__file__).parent / "cache" / "sniff_cache.json"
+        self.cache = {}
+        self._new = {}
+        self.stats = {"sniffed": 0, "cached": 0, "reclassified": 0}
+        if self.cache_path.exists():
+            try:
+                with open(self.cache_path, "r") as f:
+                    self.cache = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable sniff cache '{self.cache_path}': {e}")
+
+    @staticmethod
+    def _key(st):
+        return f"{st.st_dev}:{st.st_ino}:{st.st_mtime_ns}"
+
+    def _wants(self, item):
+        return self.mode == "all" or item.category == "Others"
+
+    def _sniff(self, path):
+        with open(path, "rb") as f:
+            return sniff_bytes(f.read(SNIFF_BYTES)) or ""
+
+    def _detected(self, item, ext):
+        if not ext:
+            return
+        category = self.rule_index.get(ext)
+        for alias in ALIASES.get(ext, ()):
+            if category is not None:
+                break
+            category = self.rule_index.get(alias)
+        if category is not None and category != item.category:
+            item.category = category
+            self.stats["reclassified"] += 1
+
+    def refine(self, items):
+        """Yield items (PlannedFile) in order, re-categorised by content where needed.
+
+        Cache misses are read on a thread pool, so sniffing overlaps the
+        scan and the transfers consuming this generator.
+        """
+        window = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for item in items:
+                if self._wants(item):
+                    st = item.stat if item.stat is not None else os.stat(item.source)
+                    key = self._key(st)
+                    ext = self.cache.get(key)
+                    if ext is not None:
+                        self.stats["cached"] += 1
+                        self._detected(item, ext)
+                        window.append((item, None, None))
+                    else:
+                        window.append((item, key, pool.submit(self._sniff, item.source)))
+                else:
+                    window.append((item, None, None))
+                while window and (len(window) > self.workers * 4 or window[0][2] is None or window[0][2].done()):
+                    yield self._finish(*window.popleft())
+            while window:
+                yield self._finish(*window.popleft())
+
+    def _finish(self, item, key, future):
+        if future is not None:
+            try:
+                ext = future.result()
+            except OSError:
+                return item
+            self.stats["sniffed"] += 1
+            self.cache[key] = self._new[key] = ext
+            self._detected(item, ext)
+        return item
+
+    def save(self):
+        """Merge newly sniffed results into the cache file (atomic replace)."""
+        if not self._new:
+            return
+        merged = {}
+        try:
+            with open(self.cache_path, "r") as f:
+                merged = json.load(f)
+        except (OSError, ValueError):
+            pass
+        merged.update(self._new)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        write_json(self.cache_path, merged, separators=(",", ":"))
+        self._new = {}
+
+    def summary(self):
+        s = self.stats
+        return f"{s['sniffed']} files sniffed, {s['cached']} from cache, {s['reclassified']} reclassified by content"
@@ -0,0 +1,296 @@
+from pathlib import Path
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from Planner import OrganizePlan, PlannedFile
+from Scanner import SourceScanner
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_ISDIR = 0x40000000
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+class InotifyBackend:
+    """Linux inotify through ctypes (no third-party dependency)."""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+
+    def __init__(self, root, recursive=False, prune=None):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.recursive = recursive
+        self.prune = {os.path.abspath(p) for p in (prune or ())}
+        self._dirs = {}
+        self._add_watch(root)
+        if recursive:
+            for dirpath, dirnames, _ in os.walk(root):
+                dirnames[:] = [d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) not in self.prune]
+                if dirpath != str(root):
+                    self._add_watch(dirpath)
+
+    def _add_watch(self, path):
+        if os.path.abspath(path) in self.prune:
+            return
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd >= 0:
+            self._dirs[wd] = str(path)
+
+    def poll(self, timeout):
+        """Wait up to timeout seconds; return the file paths that changed (None = overflow)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if wd not in self._dirs or not name:
+                continue
+            path = os.path.join(self._dirs[wd], os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_watch(path)
+                continue
+            paths.append(path)
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """Portable fallback: rescans the folder and reports new or changed files."""
+
+    def __init__(self, root, recursive=False, interval=2.0, prune=None):
+        self.root = root
+        self.recursive = recursive
+        self.interval = interval
+        self.prune = prune
+        self._known = self._snapshot()
+        self._next = time.monotonic() + interval
+
+    def _snapshot(self):
+        snapshot = {}
+        for entry in SourceScanner(self.root, self.recursive, prune=self.prune):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            snapshot[entry.path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def poll(self, timeout):
+        time.sleep(max(0.0, min(timeout, self._next - time.monotonic())))
+        if time.monotonic() < self._next:
+            return []
+        self._next = time.monotonic() + self.interval
+        current = self._snapshot()
+        changed = [p for p, sig in current.items() if self._known.get(p) != sig]
+        self._known = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    """Long-running watch mode: organizes files into a subject as they arrive.
+
+    Change events (inotify on Linux, polling elsewhere or with
+    force_polling) are coalesced per path. A file is only picked up once
+    its size and mtime have stayed the same for `settle` seconds, so files
+    still being written are held back. Ready files are organized in
+    batches through PipelineOrganizer.organize_to_subject(plan=...), either
+    when batch_size files are ready or when no new file became ready for
+    `settle` seconds. stats() reports queue depth and event-to-organized
+    latency.
+    """
+
+    def __init__(self, organizer, source_folder, subject, recursive=False, settle=2.0, batch_size=500,
+                 poll_interval=2.0, force_polling=False, initial_scan=False, **organize_options):
+        self.organizer = organizer
+        self.source = Path(source_folder)
+        self.subject = subject
+        self.recursive = recursive
+        self.settle = settle
+        self.batch_size = batch_size
+        self.organize_options = organize_options
+        self.stop_event = threading.Event()
+        prune = [subject.destination_root / subject.name]
+        self._prune = prune
+        self.backend = None
+        if not force_polling and sys.platform.startswith("linux"):
+            try:
+                self.backend = InotifyBackend(self.source, recursive, prune)
+            except (OSError, AttributeError):
+                self.backend = None
+        if self.backend is None:
+            self.backend = PollingBackend(self.source, recursive, poll_interval, prune)
+        # path -> [first seen, last change, (size, mtime_ns) at last check, time it got that signature]
+        self._pending = {}
+        # path -> (size, mtime_ns) already organized, so copies aren't repeated
+        self._done = {}
+        self._ready = []
+        self._last_ready = 0.0
+        self._latencies = []
+        self.counters = {"events": 0, "organized": 0, "failed": 0, "batches": 0, "batch_errors": 0}
+        # after a batch fails as a whole (e.g. the destination is unmounted) its
+        # files are queued again and retried with a growing delay
+        self._retry_at = 0.0
+        self._consecutive_errors = 0
+        self.last_error = None
+        if initial_scan:
+            now = time.monotonic()
+            for entry in SourceScanner(self.source, recursive, prune=prune):
+                self._pending[entry.path] = [now, now, None, now]
+
+    @property
+    def backend_name(self):
+        return "inotify" if isinstance(self.backend, InotifyBackend) else "polling"
+
+    def _note(self, paths):
+        now = time.monotonic()
+        for path in paths:
+            self.counters["events"] += 1
+            entry = self._pending.get(path)
+            if entry is None:
+                self._pending[path] = [now, now, None, now]
+            else:
+                entry[1] = now
+
+    def _check_pending(self):
+        """Move files whose size/mtime stayed put for `settle` seconds to the ready list."""
+        now = time.monotonic()
+        for path, entry in list(self._pending.items()):
+            if now - entry[1] < self.settle:
+                continue
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                del self._pending[path]
+                continue
+            except OSError:
+                continue  # unreadable for now (permissions, flaky mount); check again later
+            signature = (st.st_size, st.st_mtime_ns)
+            if signature != entry[2]:
+                entry[2], entry[3] = signature, now
+                continue
+            if now - entry[3] < self.settle:
+                continue
+            del self._pending[path]
+            if self._done.get(path) == signature:
+                continue
+            self._ready.append((path, entry[0], st))
+            self._last_ready = now
+
+    def _organize_ready(self, force=False):
+        if not self._ready:
+            return
+        now = time.monotonic()
+        if not force and now < self._retry_at:
+            return
+        quiet = now - self._last_ready >= self.settle
+        if not (force or quiet or len(self._ready) >= self.batch_size):
+            return
+        batch, self._ready = self._ready[:self.batch_size], self._ready[self.batch_size:]
+        seen = {}
+        try:
+            plan = OrganizePlan(self.source, self.subject)
+            classify = self.organizer.profile.rule_index.matcher(pass_time=self.subject.created_timestamp())
+            for path, first_seen, st in batch:
+                name = os.path.basename(path)
+                plan.add(PlannedFile(Path(path), name, classify(name, st), st))
+                seen[path] = (first_seen, (st.st_size, st.st_mtime_ns))
+            ok = self.organizer.organize_to_subject(self.source, self.subject, plan=plan,
+                                                    **self.organize_options)
+            if not ok and not self.organizer.last_results:
+                raise RuntimeError("organize run stopped before transferring anything")
+        except Exception as e:
+            self._batch_failed(batch, e)
+            return
+        self._consecutive_errors = 0
+        now = time.monotonic()
+        self.counters["batches"] += 1
+        for result in self.organizer.last_results:
+            first_seen, signature = seen.get(str(result.source), (now, None))
+            if result.ok:
+                self.counters["organized"] += 1
+                self._done[str(result.source)] = signature
+            else:
+                self.counters["failed"] += 1
+            self._latencies.append(now - first_seen)
+        # keep the latency window bounded for long-running daemons
+        del self._latencies[:-10000]
+
+    def _batch_failed(self, batch, error):
+        """Queue a batch that failed as a whole again and back off before the next try."""
+        self.counters["batch_errors"] += 1
+        self._consecutive_errors += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        delay = min(300.0, max(self.settle, 1.0) * 2 ** (self._consecutive_errors - 1))
+        self._retry_at = time.monotonic() + delay
+        self._ready = batch + self._ready
+        print(f"⚠️ Organizing {len(batch)} files failed ({self.last_error}); retrying in {delay:.0f}s")
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+        if latencies:
+            latency = {"avg": sum(latencies) / len(latencies), "max": latencies[-1],
+                       "p95": latencies[int(len(latencies) * 0.95) - 1 if len(latencies) > 1 else 0]}
+        else:
+            latency = {"avg": 0.0, "max": 0.0, "p95": 0.0}
+        return dict(self.counters, backend=self.backend_name, queue_depth=len(self._pending),
+                    ready=len(self._ready), last_error=self.last_error,
+                    latency_seconds={k: round(v, 3) for k, v in latency.items()})
+
+    def run(self, tick=0.25, report=None, report_interval=30.0):
+        """Watch until stop() is called (or KeyboardInterrupt); report(stats) is called periodically."""
+        next_report = time.monotonic() + report_interval
+        try:
+            while not self.stop_event.is_set():
+                paths = self.backend.poll(tick)
+                if paths is None:
+                    # the kernel queue overflowed: fall back to a full rescan once
+                    paths = [e.path for e in SourceScanner(self.source, self.recursive, prune=self._prune)]
+                self._note(paths)
+                self._check_pending()
+                self._organize_ready()
+                if report is not None and time.monotonic() >= next_report:
+                    report(self.stats())
+                    next_report = time.monotonic() + report_interval
+        except KeyboardInterrupt:
+            pass
+        finally:
+            try:
+                self._check_pending()
+                self._organize_ready(force=True)
+            finally:
+                self.backend.close()
+
+    def stop(self):
+        self.stop_event.set()
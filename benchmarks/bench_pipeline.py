@@ -0,0 +1,305 @@
+"""Benchmark: the whole organize pipeline on a synthetic VFX-style source tree.
+
+Run from the repo root:  python benchmarks/bench_pipeline.py [--files 20000] [--sizes mixed] [--json out.json]
+
+The dataset is generated from --seed, so two runs with the same options
+build the same tree (names, folders, sizes). Extensions are drawn from
+Profile.DEFAULT_RULES and config.json, plus a share of unknown and
+extensionless files and some 'name.####.exr' frame sequences. Each stage
+is timed --repeat times and the best run is reported:
+
+  scan       SourceScanner walk with stat
+  classify   RuleIndex classification of every name (in memory)
+  plan       plan_organize (scan + classify + destination checks)
+  copy       organize_to_subject copy into a fresh pass (with per-phase metrics)
+  move       organize_to_subject move of a copy of the source (same device)
+  summarize  summarize_subject from the stats sidecar, and a forced rescan
+  profile    Profile.save/load of a profile with --subjects subjects
+
+--json writes the results; --compare old.json prints each stage against
+an earlier run. The page cache is left warm, so numbers compare code
+paths on one machine rather than disks.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from PipelineOrganizer import PipelineOrganizer  # noqa: E402
+from Profile import Profile  # noqa: E402
+from Scanner import SourceScanner  # noqa: E402
+from Subject import Subject  # noqa: E402
+from SubjectStats import SubjectStats  # noqa: E402
+
+# (size in bytes, weight) presets
+SIZE_PRESETS = {
+    "tiny": [(512, 1)],
+    "small": [(4 * 1024, 6), (64 * 1024, 3), (512 * 1024, 1)],
+    "mixed": [(4 * 1024, 50), (256 * 1024, 30), (4 * 1024 * 1024, 15), (32 * 1024 * 1024, 5)],
+    "large": [(16 * 1024 * 1024, 3), (128 * 1024 * 1024, 1)],
+}
+RESULT_VERSION = 1
+
+
+def extension_mix():
+    """Every extension from DEFAULT_RULES and config.json (deduplicated, in order)."""
+    rules = [Profile.DEFAULT_RULES]
+    config = ROOT / "config.json"
+    if config.exists():
+        with open(config, "r") as f:
+            rules.append(json.load(f))
+    exts = []
+    for ruleset in rules:
+        for values in ruleset.values():
+            for ext in values:
+                if ext.lower() not in exts:
+                    exts.append(ext.lower())
+    return exts
+
+
+def parse_sizes(spec):
+    """'mixed' or an explicit '4096:70,1048576:30' list of size:weight pairs."""
+    if spec in SIZE_PRESETS:
+        return SIZE_PRESETS[spec]
+    pairs = []
+    for part in spec.split(","):
+        size, _, weight = part.partition(":")
+        pairs.append((int(size), float(weight or 1)))
+    return pairs
+
+
+def generate(source, args):
+    """Build the synthetic tree; returns dataset counts."""
+    rng = random.Random(args.seed)
+    sizes = parse_sizes(args.sizes)
+    size_values = [s for s, _ in sizes]
+    size_weights = [w for _, w in sizes]
+    exts = extension_mix()
+
+    folders = [source]
+    frontier = [source]
+    for depth in range(args.depth):
+        next_frontier = []
+        for folder in frontier:
+            for i in range(args.fanout):
+                child = folder / f"d{depth}_{i}"
+                child.mkdir(parents=True)
+                next_frontier.append(child)
+        folders.extend(next_frontier)
+        frontier = next_frontier
+    source.mkdir(parents=True, exist_ok=True)
+
+    payload = os.urandom(min(max(size_values), 8 * 1024 * 1024))
+    total = 0
+    n = 0
+    sequences = 0
+    while n < args.files:
+        folder = rng.choice(folders)
+        roll = rng.random()
+        if roll < args.sequence_share and args.files - n >= 24:
+            # a short frame sequence, as render output would be
+            frames = rng.randint(24, min(240, args.files - n))
+            size = rng.choices(size_values, size_weights)[0]
+            start = rng.choice((1, 1001))
+            head = f"shot{sequences:03d}_v{rng.randint(1, 9):03d}"
+            for frame in range(start, start + frames):
+                if frame == start + frames // 2 and frames > 48:
+                    continue  # leave a gap for the range report
+                total += write_file(folder / f"{head}.{frame:04d}.exr", size, payload)
+                n += 1
+            sequences += 1
+            continue
+        if roll < args.sequence_share + args.unknown_share:
+            name = f"asset_{n:07d}" + rng.choice(("", ".dat", ".bak", ".tmp"))
+        else:
+            name = f"asset_{n:07d}{rng.choice(exts)}"
+        total += write_file(folder / name, rng.choices(size_values, size_weights)[0], payload)
+        n += 1
+    return {"files": n, "bytes": total, "folders": len(folders), "sequences": sequences,
+            "extensions": len(exts)}
+
+
+def write_file(path, size, payload):
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            chunk = min(remaining, len(payload))
+            f.write(payload[:chunk])
+            remaining -= chunk
+    return size
+
+
+def best_of(repeat, run, reset=None):
+    """(best wall time, all times, run()'s return value from the best run) over repeat calls.
+
+    reset() runs untimed before each call.
+    """
+    runs = []
+    best = None
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            value = run()
+            runs.append(time.perf_counter() - start)
+        if runs[-1] == min(runs):
+            best = value
+    return min(runs), runs, best
+
+
+def stage(seconds, runs, files=None, nbytes=None, **extra):
+    result = {"seconds": round(seconds, 6), "runs": [round(r, 6) for r in runs]}
+    if files:
+        result["files_per_second"] = round(files / seconds, 1) if seconds else None
+    if nbytes:
+        result["mb_per_second"] = round(nbytes / 1e6 / seconds, 1) if seconds else None
+    result.update(extra)
+    return result
+
+
+def run_benchmarks(work, args):
+    source = work / "source"
+    start = time.perf_counter()
+    dataset = generate(source, args)
+    dataset["generate_seconds"] = round(time.perf_counter() - start, 3)
+    print(f"Dataset: {dataset['files']} files, {dataset['bytes'] / 1e6:.1f} MB, "
+          f"{dataset['folders']} folders, {dataset['sequences']} sequences ({dataset['generate_seconds']}s)")
+
+    # JSON profiles only: the numbers must not depend on PIPELINE_PROFILE_DB
+    Profile.use_store(None)
+    profile = Profile("bench_pipeline")
+    organizer = PipelineOrganizer(profile)
+    dest = work / "dest"
+    results = {}
+    files, nbytes = dataset["files"], dataset["bytes"]
+
+    def scan():
+        return sum(1 for entry in SourceScanner(source, recursive=True) if entry.stat())
+    secs, runs, _ = best_of(args.repeat, scan)
+    results["scan"] = stage(secs, runs, files)
+
+    names = [entry.name for entry in SourceScanner(source, recursive=True)]
+    secs, runs, _ = best_of(args.repeat, lambda: [organizer.classify(name) for name in names])
+    results["classify"] = stage(secs, runs, files)
+
+    subject = Subject("bench", dest, profile)
+    secs, runs, plan = best_of(args.repeat, lambda: organizer.plan_organize(source, subject, recursive=True))
+    results["plan"] = stage(secs, runs, files, others=len(plan.others))
+
+    def copy():
+        organizer.organize_to_subject(source, subject, workers=args.workers, recursive=True,
+                                      on_collision="rename", metrics=True)
+        return organizer.last_report
+    secs, runs, report = best_of(args.repeat, copy, reset=lambda: shutil.rmtree(dest, ignore_errors=True))
+    results["copy"] = stage(secs, runs, files, nbytes,
+                            phases={k: round(v, 6) for k, v in report.phases.items()},
+                            slowest=report.slowest[:3])
+
+    secs, runs, _ = best_of(args.repeat, lambda: organizer.summarize_subject(subject))
+    results["summarize"] = stage(secs, runs)
+    secs, runs, _ = best_of(args.repeat, lambda: SubjectStats(subject.destination_path).refresh(force=True))
+    results["summarize_rescan"] = stage(secs, runs, files)
+
+    move_source = work / "move_source"
+    move_dest = work / "move_dest"
+
+    def reset_move():
+        shutil.rmtree(move_dest, ignore_errors=True)
+        shutil.rmtree(move_source, ignore_errors=True)
+        shutil.copytree(source, move_source)
+    move_subject = Subject("bench", move_dest, profile)
+    secs, runs, _ = best_of(args.repeat, lambda: organizer.organize_to_subject(
+        move_source, move_subject, workers=args.workers, recursive=True, move=True, on_collision="rename"),
+        reset=reset_move)
+    results["move"] = stage(secs, runs, files)
+    shutil.rmtree(move_source, ignore_errors=True)
+    shutil.rmtree(move_dest, ignore_errors=True)
+
+    profiles_dir = work / "profiles"
+    big = Profile("bench_profile", allow_subsubjects=True)
+    for i in range(args.subjects):
+        big.subjects[f"subject_{i:05d}"] = {f"pass{p:03d}": str(dest / f"subject_{i:05d}" / f"pass{p:03d}")
+                                           for p in range(1, 4)}
+    secs, runs, _ = best_of(args.repeat, lambda: big.save(str(profiles_dir)))
+    size = os.path.getsize(profiles_dir / "bench_profile.json")
+    results["profile_save"] = stage(secs, runs, bytes=size)
+    secs, runs, _ = best_of(args.repeat, lambda: Profile.load("bench_profile", str(profiles_dir)))
+    results["profile_load"] = stage(secs, runs)
+    return dataset, results
+
+
+def compare(results, path):
+    with open(path, "r") as f:
+        old = json.load(f)["results"]
+    print(f"\nCompared with {path}:")
+    for name, current in results.items():
+        if name in old and old[name]["seconds"]:
+            ratio = current["seconds"] / old[name]["seconds"]
+            mark = "slower" if ratio > 1.05 else "faster" if ratio < 0.95 else "same"
+            print(f"  {name:<17} {old[name]['seconds']:.4f}s -> {current['seconds']:.4f}s  x{ratio:.2f} {mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=tempfile.gettempdir(), help="filesystem to benchmark on")
+    parser.add_argument("--files", type=int, default=20_000)
+    parser.add_argument("--sizes", default="small",
+                        help=f"size distribution: {', '.join(SIZE_PRESETS)} or 'bytes:weight,...' (default: small)")
+    parser.add_argument("--depth", type=int, default=3, help="folder nesting depth")
+    parser.add_argument("--fanout", type=int, default=4, help="subfolders per folder")
+    parser.add_argument("--unknown-share", type=float, default=0.05,
+                        help="share of files with no or an unknown extension")
+    parser.add_argument("--sequence-share", type=float, default=0.02,
+                        help="chance per draw of starting a frame sequence")
+    parser.add_argument("--subjects", type=int, default=2000, help="subjects in the profile save/load test")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier --json output to compare against")
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="bench_pipeline_", dir=args.dir))
+    try:
+        dataset, results = run_benchmarks(work, args)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    for name, result in results.items():
+        rate = result.get("files_per_second")
+        extra = f"  {rate:,.0f} files/s" if rate else ""
+        if result.get("mb_per_second"):
+            extra += f"  {result['mb_per_second']} MB/s"
+        print(f"  {name:<17}: {result['seconds']:.4f}s{extra}")
+
+    output = {
+        "benchmark": "pipeline",
+        "version": RESULT_VERSION,
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "cpus": os.cpu_count()},
+        "params": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+        "dataset": dataset,
+        "results": results,
+    }
+    if args.compare:
+        compare(results, args.compare)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
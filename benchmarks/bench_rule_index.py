@@ -0,0 +1,101 @@
+"""Micro-benchmark: compiled RuleIndex vs the old per-file linear scan.
+
+Run from the repo root:  python benchmarks/bench_rule_index.py [--files N] [--predicates N]
+
+Also times predicate rules (globs plus a size and a date rule) through the
+merged matcher against checking each rule's pattern in turn.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from Profile import Profile  # noqa: E402
+from RuleIndex import RuleIndex  # noqa: E402
+
+
+def linear_get_category(rules, file_extension):
+    # the pre-index implementation of PipelineOrganizer.get_category
+    for category, extensions in rules.items():
+        normalized_exts = [e if e.startswith('.') else f".{e}" for e in extensions]
+        if file_extension.lower() in (e.lower() for e in normalized_exts):
+            return category
+    return "Others"
+
+
+def load_rules():
+    rules = dict(Profile.DEFAULT_RULES)
+    config = Path(__file__).resolve().parents[1] / "config.json"
+    if config.exists():
+        with open(config, "r") as f:
+            rules.update(json.load(f))
+    return rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--predicates", type=int, default=50, help="glob rules in the predicate test")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rules = load_rules()
+    exts = [e for values in rules.values() for e in values] + [".bin", ".TAR.GZ", ""]
+    rng = random.Random(0)
+    names = [f"file_{i}{rng.choice(exts)}" for i in range(args.files)]
+    suffixes = [Path(n).suffix for n in names]
+
+    index = RuleIndex(rules)
+    # sanity check: both implementations agree on single suffixes
+    assert all(linear_get_category(rules, s) == index.get(s, "Others") for s in suffixes[:1000])
+
+    linear = min(timeit.repeat(lambda: [linear_get_category(rules, s) for s in suffixes],
+                               number=1, repeat=args.repeat))
+    indexed = min(timeit.repeat(lambda: [index.get(s, "Others") for s in suffixes],
+                                number=1, repeat=args.repeat))
+    compound = min(timeit.repeat(lambda: [index.classify(n) for n in names],
+                                 number=1, repeat=args.repeat))
+    build = min(timeit.repeat(lambda: RuleIndex(rules), number=100, repeat=args.repeat)) / 100
+
+    print(f"{args.files} files, {len(rules)} categories, {len(index)} extensions")
+    print(f"  linear scan        : {linear:.3f}s ({args.files / linear:,.0f} files/s)")
+    print(f"  index (suffix)     : {indexed:.3f}s ({args.files / indexed:,.0f} files/s)")
+    print(f"  index (compound)   : {compound:.3f}s ({args.files / compound:,.0f} files/s)")
+    print(f"  index build        : {build * 1e6:.1f}us")
+    print(f"  speed-up (suffix)  : {linear / indexed:.1f}x")
+
+    # predicate rules: many globs, a size rule and a date rule ahead of the extensions
+    predicate_rules = {f"Textures/t{i}": [{"glob": f"*_t{i}_*.png"}] for i in range(args.predicates)}
+    predicate_rules["Caches"] = [{"min_size": "2GB"}]
+    predicate_rules["Archive"] = [{"glob": "*.bak", "modified_before": "2001-01-01"}]
+    predicate_rules.update(rules)
+    tagged = [f"asset_t{rng.randrange(args.predicates * 2)}_{i}.png" if i % 3 else name
+              for i, name in enumerate(names)]
+    st = os.stat(__file__)
+    predicate_index = RuleIndex(predicate_rules)
+    classify = predicate_index.matcher()
+    looped = [(re.compile(rule.pattern, re.IGNORECASE), rule.category)
+              for rule in predicate_index.rules if rule.pattern and not rule.uses_stat]
+
+    def one_by_one(name):
+        for pattern, category in looped:
+            if pattern.match(name):
+                return category
+        return predicate_index.by_extension(name)
+    assert all(one_by_one(n) == classify(n, st) for n in tagged[:1000])
+
+    merged = min(timeit.repeat(lambda: [classify(n, st) for n in tagged], number=1, repeat=args.repeat))
+    per_rule = min(timeit.repeat(lambda: [one_by_one(n) for n in tagged], number=1, repeat=args.repeat))
+    print(f"{args.predicates} glob rules + size/date rules, 2/3 of names glob-tagged")
+    print(f"  rule by rule       : {per_rule:.3f}s ({args.files / per_rule:,.0f} files/s)")
+    print(f"  merged matcher     : {merged:.3f}s ({args.files / merged:,.0f} files/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark: organize_to_subject on many tiny files, thread pool vs batched async engine.
+
+Run from the repo root:  python benchmarks/bench_small_files.py [--files 10000] [--size 4096] [--workers 8]
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from Profile import Profile  # noqa: E402
+from PipelineOrganizer import PipelineOrganizer  # noqa: E402
+from Subject import Subject  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=tempfile.gettempdir(), help="filesystem to benchmark on")
+    parser.add_argument("--files", type=int, default=10_000)
+    parser.add_argument("--size", type=int, default=4096, help="bytes per file")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="bench_small_files_", dir=args.dir))
+    try:
+        source = work / "source"
+        source.mkdir()
+        exts = [e for values in Profile.DEFAULT_RULES.values() for e in values] + [".txt"]
+        payload = os.urandom(args.size)
+        for i in range(args.files):
+            (source / f"tex_{i:06d}{exts[i % len(exts)]}").write_bytes(payload)
+
+        profile = Profile("bench")
+        organizer = PipelineOrganizer(profile)
+        print(f"{args.files} x {args.size} B files, {args.workers} workers, {work}")
+        for label, options in (
+            ("copy2, sequential", {"workers": 1}),
+            ("copy2, thread pool", {"workers": args.workers}),
+            ("batched async", {"workers": args.workers, "small_file_batching": True}),
+        ):
+            dest = work / "dest"
+            subject = Subject("bench", dest, profile)
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                organizer.organize_to_subject(source, subject, **options)
+                seconds = time.perf_counter() - start
+            assert sum(r.ok for r in organizer.last_results) == args.files
+            print(f"  {label:<20}: {seconds:.3f}s  {args.files / seconds:,.0f} files/s")
+            shutil.rmtree(dest)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
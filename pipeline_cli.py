@@ -0,0 +1,426 @@
+"""Headless batch entry point for the Pipeline Organizer.
+
+Organize one job from the command line:
+
+    python pipeline_cli.py --profile "3d pipeline" --subject shot010 \
+        --dest /mnt/projects /renders/shot010 /exports/shot010
+
+or many jobs from a manifest (a JSON list of job objects, or JSONL with one
+job per line) using the same keys as the options below:
+
+    python pipeline_cli.py --manifest jobs.jsonl --jobs 4
+
+or keep watching a drop folder and organize files as they finish arriving:
+
+    python pipeline_cli.py --watch --profile "3d pipeline" --subject shot010 /renders/incoming
+
+Results are written to stdout as JSON; all progress output goes to stderr.
+Exit status: 0 when every job succeeded, 1 when any job or file failed,
+2 for invalid arguments or manifests.
+"""
+import argparse
+import contextlib
+import json
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+
+from Checksums import VERIFY_MODES
+from DestinationIndex import COLLISION_POLICIES
+from IngestScheduler import IngestScheduler
+from Metrics import write_reports
+from Profile import Profile
+from Subject import Subject
+from TypeSniffer import SNIFF_MODES
+from PipelineOrganizer import PipelineOrganizer
+from WatchFolder import FolderWatcher
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+JOB_KEYS = {"profile", "subject", "destination", "pass", "sources", "source", "move", "workers",
+            "recursive", "include", "exclude", "max_depth", "incremental", "hash_check", "dedup",
+            "large_file_threshold", "small_file_batching", "on_collision", "journal", "sniff",
+            "sequences", "priority", "verify"}
+
+
+class JobError(Exception):
+    pass
+
+
+def load_manifest(path):
+    text = Path(path).read_text()
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        jobs = json.loads(text)
+    else:
+        jobs = [json.loads(line) for line in text.splitlines() if line.strip()]
+    for i, job in enumerate(jobs):
+        if not isinstance(job, dict):
+            raise JobError(f"job #{i + 1} is not an object")
+        unknown = set(job) - JOB_KEYS
+        if unknown:
+            raise JobError(f"job #{i + 1} has unknown keys: {', '.join(sorted(unknown))}")
+        for key in ("profile", "subject"):
+            if not job.get(key):
+                raise JobError(f"job #{i + 1} is missing '{key}'")
+        if not (job.get("sources") or job.get("source")):
+            raise JobError(f"job #{i + 1} has no 'sources'")
+    return jobs
+
+
+def stored_destination_root(profile, subject_name):
+    """Destination root of an already registered subject, or None."""
+    entry = profile.subjects.get(subject_name)
+    if isinstance(entry, dict) and entry:
+        # passes are stored as <destination_root>/<subject>/<passNNN>
+        return Path(next(iter(entry.values()))).parents[1]
+    if isinstance(entry, str):
+        return Path(entry).parent
+    return None
+
+
+class BatchRunner:
+    """Runs organize jobs concurrently, sharing one Profile per profile name.
+
+    Jobs go through an IngestScheduler: higher 'priority' jobs start first
+    and per-destination-device caps keep one slow mount from taking every
+    slot. Aggregate numbers of the last run are kept in self.stats.
+    """
+
+    def __init__(self, profiles_dir="profiles", dry_run=False, metrics=False):
+        self.profiles_dir = profiles_dir
+        self.dry_run = dry_run
+        self.stats = {}
+        # RunReports of every organize run when metrics is set
+        self.metrics = metrics
+        self.reports = []
+        self._profiles = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _profile(self, name):
+        with self._lock:
+            if name not in self._profiles:
+                self._profiles[name] = Profile.load(name, self.profiles_dir)
+                self._locks[name] = threading.Lock()
+            return self._profiles[name], self._locks[name]
+
+    def run_job(self, job):
+        start = time.perf_counter()
+        sources = job.get("sources") or [job["source"]]
+        if isinstance(sources, str):
+            sources = [sources]
+        result = {"profile": job["profile"], "subject": job["subject"], "sources": sources,
+                  "ok": False, "copied": 0, "bytes": 0, "failed": []}
+        try:
+            missing = [src for src in sources if not Path(src).is_dir()]
+            if missing:
+                raise JobError(f"source folder not found: {', '.join(missing)}")
+            profile, profile_lock = self._profile(job["profile"])
+            # subject registration mutates the shared profile; organizing does not
+            with profile_lock:
+                destination = job.get("destination") or stored_destination_root(profile, job["subject"])
+                if destination is None:
+                    raise JobError(f"subject '{job['subject']}' is not registered; pass a destination")
+                organizer = PipelineOrganizer(profile)
+                if self.dry_run:
+                    # describe the pass a real run would get, without reserving it
+                    pass_name = job.get("pass") or (profile.next_pass_name(job["subject"])
+                                                    if profile.allow_subsubjects else None)
+                    subject = Subject(job["subject"], destination, profile, pass_name)
+                elif profile.allow_subsubjects or job["subject"] not in profile.subjects:
+                    subject = organizer.create_subject(job["subject"], destination, job.get("pass"))
+                else:
+                    subject = Subject(job["subject"], destination, profile, None)
+            result["pass"] = subject.pass_name
+            result["destination"] = str(subject.destination_path)
+
+            if self.dry_run:
+                result["plans"] = [organizer.plan_organize(
+                    source, subject,
+                    recursive=job.get("recursive", False),
+                    include=job.get("include"),
+                    exclude=job.get("exclude"),
+                    max_depth=job.get("max_depth"),
+                    sniff=job.get("sniff"),
+                    sequences=job.get("sequences", False),
+                ).to_dict() for source in sources]
+                result["ok"] = True
+                result["seconds"] = round(time.perf_counter() - start, 3)
+                return result
+
+            ok = True
+            for source in sources:
+                ok = organizer.organize_to_subject(
+                    source, subject,
+                    copy_function=shutil.move if job.get("move") else shutil.copy2,
+                    workers=job.get("workers", 4),
+                    recursive=job.get("recursive", False),
+                    include=job.get("include"),
+                    exclude=job.get("exclude"),
+                    max_depth=job.get("max_depth"),
+                    incremental=job.get("incremental", False),
+                    hash_check=job.get("hash_check", False),
+                    dedup=job.get("dedup", False),
+                    large_file_threshold=job.get("large_file_threshold"),
+                    small_file_batching=job.get("small_file_batching", False),
+                    on_collision=job.get("on_collision", "overwrite"),
+                    journal=job.get("journal", False),
+                    sniff=job.get("sniff"),
+                    sequences=job.get("sequences", False),
+                    verify=job.get("verify"),
+                    metrics=self.metrics,
+                ) and ok
+                if organizer.last_report is not None:
+                    with self._lock:
+                        self.reports.append(organizer.last_report)
+                if organizer.last_verify is not None:
+                    result.setdefault("verify", []).append(organizer.last_verify)
+                for r in organizer.last_results:
+                    if r.ok:
+                        result["copied"] += 1
+                        result["bytes"] += r.size
+                    else:
+                        result["failed"].append({"source": str(r.source), "error": str(r.error)})
+            result["ok"] = ok and not result["failed"]
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        return result
+
+    def _destination_hint(self, job):
+        """Destination root a job will write to, for device scheduling (None if unknown yet)."""
+        if job.get("destination"):
+            return job["destination"]
+        try:
+            profile, _ = self._profile(job["profile"])
+        except Exception:
+            return None
+        return stored_destination_root(profile, job["subject"])
+
+    def run(self, jobs, concurrency=1, per_device=None, device_limits=None):
+        """Run all jobs; returns their results in manifest order.
+
+        per_device caps jobs writing to the same device (default: no cap
+        beyond concurrency); device_limits maps a mount/path to its own cap.
+        """
+        scheduler = IngestScheduler(concurrency, per_device or concurrency, device_limits)
+        for i, job in enumerate(jobs):
+            scheduler.submit(lambda job=job: self.run_job(job), self._destination_hint(job),
+                             job.get("priority", 0), f"#{i + 1} {job['subject']}")
+        scheduler.run()
+        self.stats = scheduler.stats()
+        print(scheduler.describe())
+        return [job.result if job.result is not None else {"ok": False, "error": job.error}
+                for job in scheduler.jobs]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Organize files into profile subjects without the GUI.",
+        epilog="Results are printed to stdout as JSON; exit status is 0 (ok), 1 (failures) or 2 (usage).",
+    )
+    parser.add_argument("sources", nargs="*", help="source folder(s) to organize")
+    parser.add_argument("--manifest", help="JSON or JSONL file with many jobs (overrides the single-job options)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only scan and report what would be organized (files per category, bytes, collisions)")
+    parser.add_argument("--jobs", type=int, default=1, help="number of jobs to run at once (default: 1)")
+    parser.add_argument("--per-device", type=int,
+                        help="at most this many jobs writing to the same destination device (default: --jobs)")
+    parser.add_argument("--device-limit", action="append", metavar="PATH=N",
+                        help="cap jobs writing to the device holding PATH, e.g. /mnt/nas=1 (repeatable)")
+    parser.add_argument("--profiles-dir",
+                        help="folder holding the JSON profiles, relative to the current directory "
+                             "(default: the 'profiles' folder next to the organizer)")
+    parser.add_argument("--profile", help="profile name")
+    parser.add_argument("--subject", help="subject/project name")
+    parser.add_argument("--dest", dest="destination", help="destination root (default: the subject's stored root)")
+    parser.add_argument("--pass", dest="pass_name", help="pass name (default: next passNNN)")
+    parser.add_argument("--move", action="store_true", help="move files instead of copying")
+    parser.add_argument("--workers", type=int, default=4, help="parallel transfers per job (default: 4)")
+    parser.add_argument("--recursive", action="store_true", help="include subfolders")
+    parser.add_argument("--include", action="append", help="glob of files to include (repeatable)")
+    parser.add_argument("--exclude", action="append", help="glob of files/folders to skip (repeatable)")
+    parser.add_argument("--max-depth", type=int, help="maximum folder depth when recursive")
+    parser.add_argument("--incremental", action="store_true", help="skip files unchanged since the last run")
+    parser.add_argument("--hash-check", action="store_true", help="compare content hashes in incremental mode")
+    parser.add_argument("--dedup", action="store_true", help="place files through the content store")
+    parser.add_argument("--on-collision", choices=COLLISION_POLICIES, default="overwrite",
+                        help="what to do when a destination name is taken (default: overwrite)")
+    parser.add_argument("--batch-small-files", action="store_true",
+                        help="copy through the batched small-file pipeline")
+    parser.add_argument("--large-file-mb", type=int,
+                        help="copy files of at least this many MB with the large-file backend")
+    parser.add_argument("--sniff", choices=SNIFF_MODES,
+                        help="classify by file content: 'unknown' files only, or 'all' to fix mislabelled ones")
+    parser.add_argument("--sequences", action="store_true",
+                        help="detect image sequences (name.####.exr) and transfer each as one block")
+    parser.add_argument("--verify", choices=VERIFY_MODES,
+                        help="record checksums of placed files ('record') or also compare them with the sources ('full')")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="write per-run timings and counters to FILE (Prometheus text if it ends in .prom, else JSON)")
+    parser.add_argument("--journal", action="store_true",
+                        help="write a job journal and temp files so an interrupted run can be resumed")
+    parser.add_argument("--resume", action="store_true",
+                        help="finish the interrupted journaled run in --profile/--subject/--pass")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and organize files as they arrive in the source folder")
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="with --watch: seconds a file's size must stay unchanged before it is organized")
+    parser.add_argument("--poll", action="store_true", help="with --watch: poll instead of using inotify")
+    return parser
+
+
+def profiles_dir(args):
+    """--profiles-dir resolved against the working directory (Profile.load would
+    resolve a relative folder against the script folder), else the bundled one."""
+    return str(Path(args.profiles_dir).resolve()) if args.profiles_dir else "profiles"
+
+
+def print_error(message):
+    """Report a run that failed before producing job results, as JSON on stdout."""
+    print(message, file=sys.stderr)
+    json.dump({"ok": False, "error": message, "jobs": []}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+def resume(args):
+    """Finish the journaled job left in a pass folder; returns a job result dict."""
+    profile = Profile.load(args.profile, profiles_dir(args))
+    destination = args.destination or stored_destination_root(profile, args.subject)
+    if destination is None:
+        raise JobError(f"subject '{args.subject}' is not registered; pass a destination")
+    if profile.allow_subsubjects and not args.pass_name:
+        raise JobError("--resume needs the --pass of the interrupted run")
+    subject = Subject(args.subject, destination, profile, args.pass_name if profile.allow_subsubjects else None)
+    organizer = PipelineOrganizer(profile)
+    start = time.perf_counter()
+    ok = organizer.resume_job(subject, workers=args.workers)
+    failed = [{"source": str(r.source), "error": str(r.error)} for r in organizer.last_results if not r.ok]
+    return {"profile": args.profile, "subject": args.subject, "pass": subject.pass_name,
+            "destination": str(subject.destination_path), "resumed": ok is not None,
+            "ok": ok is not False and not failed,
+            "copied": sum(1 for r in organizer.last_results if r.ok), "failed": failed,
+            "seconds": round(time.perf_counter() - start, 3)}
+
+
+def watch(args):
+    """Run one single-source job in watch mode until interrupted; returns the final stats."""
+    if not Path(args.sources[0]).is_dir():
+        raise JobError(f"source folder not found: {args.sources[0]}")
+    profile = Profile.load(args.profile, profiles_dir(args))
+    destination = args.destination or stored_destination_root(profile, args.subject)
+    if destination is None:
+        raise JobError(f"subject '{args.subject}' is not registered; pass a destination")
+    organizer = PipelineOrganizer(profile)
+    if profile.allow_subsubjects or args.subject not in profile.subjects:
+        subject = organizer.create_subject(args.subject, destination, args.pass_name)
+    else:
+        subject = Subject(args.subject, destination, profile, None)
+    watcher = FolderWatcher(
+        organizer, args.sources[0], subject,
+        recursive=args.recursive, settle=args.settle, force_polling=args.poll,
+        copy_function=shutil.move if args.move else shutil.copy2,
+        workers=args.workers,
+        dedup=args.dedup,
+        on_collision=args.on_collision,
+    )
+    print(f"Watching {args.sources[0]} ({watcher.backend_name}) -> {subject.destination_path}; "
+          f"Ctrl+C to stop", file=sys.stderr)
+    watcher.run(report=lambda stats: print(json.dumps(stats), file=sys.stderr))
+    return watcher.stats()
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.resume:
+        if args.manifest or args.watch or not (args.profile and args.subject):
+            parser.print_usage(sys.stderr)
+            print("--resume needs --profile and --subject (and --pass for multi-pass profiles)", file=sys.stderr)
+            return EXIT_USAGE
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                result = resume(args)
+        except Exception as e:
+            print_error(f"Resume failed: {type(e).__name__}: {e}")
+            return EXIT_FAILED
+        json.dump({"ok": result["ok"], "jobs": [result]}, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return EXIT_OK if result["ok"] else EXIT_FAILED
+
+    if args.watch:
+        if args.manifest or args.dry_run or len(args.sources) != 1 or not (args.profile and args.subject):
+            parser.print_usage(sys.stderr)
+            print("--watch needs --profile, --subject and exactly one source (no --manifest/--dry-run)",
+                  file=sys.stderr)
+            return EXIT_USAGE
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                stats = watch(args)
+        except Exception as e:
+            print_error(f"Watch failed: {type(e).__name__}: {e}")
+            return EXIT_FAILED
+        json.dump(dict(stats, ok=not stats["failed"]), sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return EXIT_OK if not stats["failed"] else EXIT_FAILED
+
+    if args.manifest:
+        try:
+            jobs = load_manifest(args.manifest)
+        except (OSError, ValueError, JobError) as e:
+            print(f"Invalid manifest '{args.manifest}': {e}", file=sys.stderr)
+            return EXIT_USAGE
+    else:
+        if not (args.profile and args.subject and args.sources):
+            parser.print_usage(sys.stderr)
+            print("--profile, --subject and at least one source are required without --manifest",
+                  file=sys.stderr)
+            return EXIT_USAGE
+        jobs = [{
+            "profile": args.profile, "subject": args.subject, "destination": args.destination,
+            "pass": args.pass_name, "sources": args.sources, "move": args.move, "workers": args.workers,
+            "recursive": args.recursive, "include": args.include, "exclude": args.exclude,
+            "max_depth": args.max_depth, "incremental": args.incremental, "hash_check": args.hash_check,
+            "dedup": args.dedup,
+            "small_file_batching": args.batch_small_files,
+            "on_collision": args.on_collision,
+            "large_file_threshold": args.large_file_mb * 1024 * 1024 if args.large_file_mb is not None else None,
+            "journal": args.journal,
+            "sniff": args.sniff,
+            "sequences": args.sequences,
+            "verify": args.verify,
+        }]
+
+    device_limits = {}
+    for spec in args.device_limit or ():
+        path, _, limit = spec.rpartition("=")
+        if not path or not limit.isdigit():
+            print(f"Invalid --device-limit '{spec}', expected PATH=N", file=sys.stderr)
+            return EXIT_USAGE
+        device_limits[path] = int(limit)
+
+    out = sys.stdout
+    runner = BatchRunner(profiles_dir(args), args.dry_run, metrics=bool(args.metrics))
+    # the organizer reports with print(); keep stdout clean for the JSON result
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            results = runner.run(jobs, args.jobs, args.per_device, device_limits)
+        except OSError as e:
+            print(f"Invalid --device-limit: {e}", file=sys.stderr)
+            return EXIT_USAGE
+    if args.metrics:
+        write_reports(runner.reports, args.metrics)
+    ok = all(r["ok"] for r in results)
+    json.dump({"ok": ok, "stats": runner.stats, "jobs": results}, out, indent=2)
+    out.write("\n")
+    return EXIT_OK if ok else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
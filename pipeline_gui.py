@@ -1,18 +1,24 @@
 import sys
 import shutil
+import threading
+import time
 import traceback
 from pathlib import Path
 from PySide6 import QtWidgets, QtCore
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QFileDialog, QMessageBox,
     QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QLineEdit, QTextEdit,
-    QComboBox, QCheckBox, QListWidget, QListWidgetItem
+    QComboBox, QCheckBox, QListWidget, QListWidgetItem, QSpinBox, QProgressBar
 )
 
 # --- Backend imports (must exist in same folder) ---
 from Profile import Profile
 from Subject import Subject
 from PipelineOrganizer import PipelineOrganizer
+from DestinationIndex import COLLISION_POLICIES
+from Scanner import SourceScanner
+from Sequences import format_ranges, frame_count
+from SubjectStats import SubjectStats
 
 
 # -------------------- CREATE PROFILE DIALOG --------------------
@@ -145,6 +151,84 @@ class CreateProfileDialog(QtWidgets.QDialog):
         self.accept()
 
 
+# -------------------- ORGANIZE WORKER --------------------
+class OrganizeWorker(QtCore.QThread):
+    """Runs PipelineOrganizer.organize_to_subject off the GUI thread."""
+    counted = QtCore.Signal(int)
+    progress = QtCore.Signal(int, int, float)  # files done, bytes done, elapsed seconds
+    done = QtCore.Signal(bool, list)  # ok, failed TransferResults
+    error = QtCore.Signal(str)
+
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, organizer, source, subject, options, parent=None):
+        super().__init__(parent)
+        self.organizer = organizer
+        self.source = source
+        self.subject = subject
+        self.options = options
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            # pre-count with the same scan options so the progress bar has a total
+            plan = self.options.get("plan")
+            total = len(plan) if plan is not None else 0
+            if plan is None:
+                for _ in SourceScanner(self.source, self.options.get("recursive", False),
+                                       prune=[self.subject.destination_root / self.subject.name]):
+                    if self.cancel_event.is_set():
+                        break
+                    total += 1
+            self.counted.emit(total)
+
+            start = time.perf_counter()
+            state = {"files": 0, "bytes": 0, "last": 0.0}
+
+            def on_result(result):
+                state["files"] += 1
+                state["bytes"] += result.size
+                now = time.perf_counter()
+                # throttle signals so fast small-file runs don't flood the event loop
+                if now - state["last"] >= self.PROGRESS_INTERVAL:
+                    state["last"] = now
+                    self.progress.emit(state["files"], state["bytes"], now - start)
+
+            ok = self.organizer.organize_to_subject(
+                str(self.source), self.subject,
+                progress=on_result, cancel_event=self.cancel_event, **self.options
+            )
+            self.progress.emit(state["files"], state["bytes"], time.perf_counter() - start)
+            self.done.emit(ok, [r for r in self.organizer.last_results if not r.ok])
+        except Exception:
+            self.error.emit(traceback.format_exc())
+
+
+class PlanWorker(QtCore.QThread):
+    """Builds an OrganizePlan (dry run) off the GUI thread."""
+    planned = QtCore.Signal(object)
+    error = QtCore.Signal(str)
+
+    def __init__(self, organizer, source, subject, recursive, sniff=None, sequences=False, parent=None):
+        super().__init__(parent)
+        self.organizer = organizer
+        self.source = source
+        self.subject = subject
+        self.recursive = recursive
+        self.sniff = sniff
+        self.sequences = sequences
+
+    def run(self):
+        try:
+            self.planned.emit(self.organizer.plan_organize(self.source, self.subject, recursive=self.recursive,
+                                                            sniff=self.sniff, sequences=self.sequences))
+        except Exception:
+            self.error.emit(traceback.format_exc())
+
+
 # -------------------- MAIN GUI --------------------
 class PipelineGUI(QMainWindow):
     def __init__(self):
@@ -226,13 +310,53 @@ class PipelineGUI(QMainWindow):
         layout.addLayout(opt_row)
         self.move_checkbox = QCheckBox("Move files instead of copying")
         opt_row.addWidget(self.move_checkbox)
+        self.recursive_checkbox = QCheckBox("Include subfolders")
+        opt_row.addWidget(self.recursive_checkbox)
+        self.incremental_checkbox = QCheckBox("Skip unchanged files")
+        opt_row.addWidget(self.incremental_checkbox)
+        self.dedup_checkbox = QCheckBox("Deduplicate passes")
+        opt_row.addWidget(self.dedup_checkbox)
+        self.batch_small_checkbox = QCheckBox("Batch small files")
+        opt_row.addWidget(self.batch_small_checkbox)
+        self.sniff_checkbox = QCheckBox("Detect unknown types by content")
+        opt_row.addWidget(self.sniff_checkbox)
+        self.sequences_checkbox = QCheckBox("Group image sequences")
+        opt_row.addWidget(self.sequences_checkbox)
+        self.verify_checkbox = QCheckBox("Verify checksums")
+        opt_row.addWidget(self.verify_checkbox)
+        opt_row.addWidget(QLabel("If name exists:"))
+        self.collision_combo = QComboBox()
+        self.collision_combo.addItems(COLLISION_POLICIES)
+        opt_row.addWidget(self.collision_combo)
+        opt_row.addWidget(QLabel("Parallel transfers:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, 64)
+        self.workers_spin.setValue(4)
+        opt_row.addWidget(self.workers_spin)
         opt_row.addStretch()
 
         # --- Actions ---
         actions = QHBoxLayout()
         layout.addLayout(actions)
+        self.preview_btn = QPushButton("Preview")
+        actions.addWidget(self.preview_btn)
         self.start_btn = QPushButton("Start Organizing")
         actions.addWidget(self.start_btn)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+        actions.addWidget(self.cancel_btn)
+
+        # --- Progress ---
+        progress_row = QHBoxLayout()
+        layout.addLayout(progress_row)
+        self.progress_bar = QProgressBar()
+        progress_row.addWidget(self.progress_bar)
+        self.throughput_label = QLabel("")
+        progress_row.addWidget(self.throughput_label)
+        self.worker = None
+        self.plan_worker = None
+        # (source, subject name, dest root, recursive) -> plan from the last Preview
+        self.last_plan = None
 
         # --- Log ---
         self.log = QTextEdit()
@@ -244,6 +368,8 @@ class PipelineGUI(QMainWindow):
         layout.addLayout(sum_row)
         self.summary_btn = QPushButton("Show Summary")
         sum_row.addWidget(self.summary_btn)
+        self.rescan_btn = QPushButton("Rescan Summary")
+        sum_row.addWidget(self.rescan_btn)
         sum_row.addStretch()
 
         # Connections
@@ -252,8 +378,11 @@ class PipelineGUI(QMainWindow):
         self.delete_subject_btn.clicked.connect(self.delete_subject)
         self.src_browse.clicked.connect(self.browse_source)
         self.dst_browse.clicked.connect(self.browse_destination)
+        self.preview_btn.clicked.connect(self.preview_organize)
         self.start_btn.clicked.connect(self.start_organize)
+        self.cancel_btn.clicked.connect(self.cancel_organize)
         self.summary_btn.clicked.connect(self.show_summary)
+        self.rescan_btn.clicked.connect(lambda: self.show_summary(rescan=True))
         self.profile_combo.currentTextChanged.connect(self.on_profile_selected)
 
         self.refresh_profiles()
@@ -398,45 +527,173 @@ class PipelineGUI(QMainWindow):
                 QMessageBox.warning(self, "Missing name", "Enter subject/project name.")
                 return
 
+            if self.worker is not None and self.worker.isRunning():
+                QMessageBox.warning(self, "Busy", "An organize job is already running.")
+                return
+
             organizer = PipelineOrganizer(self.current_profile)
             subject = organizer.create_subject(subj_name, str(dest_root), pass_name=None)
             move_files = self.move_checkbox.isChecked()
-
-            ok = organizer.organize_to_subject(
-                str(source),
-                subject,
-                copy_function=(shutil.move if move_files else shutil.copy2)
-            )
-
-            if ok:
-                self.refresh_subjects_list()
-                self.log_msg("✅ Organization complete.")
-            else:
-                self.log_msg("⚠️ Organization finished with issues.")
+            options = {
+                "copy_function": shutil.move if move_files else shutil.copy2,
+                "workers": self.workers_spin.value(),
+                "recursive": self.recursive_checkbox.isChecked(),
+                "incremental": self.incremental_checkbox.isChecked(),
+                "dedup": self.dedup_checkbox.isChecked(),
+                "small_file_batching": self.batch_small_checkbox.isChecked(),
+                "on_collision": self.collision_combo.currentText(),
+                "sniff": "unknown" if self.sniff_checkbox.isChecked() else None,
+                "sequences": self.sequences_checkbox.isChecked(),
+                "verify": "full" if self.verify_checkbox.isChecked() else None,
+                # phase timings for the log; cheap enough to leave on
+                "metrics": True,
+            }
+
+            # reuse the Preview scan when nothing relevant changed since
+            plan_key = (str(source), subj_name, str(dest_root), options["recursive"], options["sniff"],
+                        options["sequences"])
+            if self.last_plan is not None and self.last_plan[0] == plan_key:
+                options["plan"] = self.last_plan[1]
+                self.log_msg("Using the previewed plan (no rescan).")
+            self.last_plan = None
+
+            self.worker = OrganizeWorker(organizer, source, subject, options, self)
+            self.worker.counted.connect(self.on_organize_counted)
+            self.worker.progress.connect(self.on_organize_progress)
+            self.worker.done.connect(self.on_organize_done)
+            self.worker.error.connect(self.on_organize_error)
+            self.worker.finished.connect(self.on_worker_finished)
+            self.progress_bar.setRange(0, 0)  # busy indicator while counting
+            self.throughput_label.setText("Scanning...")
+            self.start_btn.setEnabled(False)
+            self.cancel_btn.setEnabled(True)
+            self.log_msg(f"Organizing '{source}' into '{subject.destination_path}'...")
+            self.worker.start()
 
         except Exception as e:
             self.log_msg(traceback.format_exc())
             QMessageBox.critical(self, "Error", str(e))
 
-    def show_summary(self):
+    def preview_organize(self):
+        """Dry run: show what Start would do without touching the destination."""
+        if not self.current_profile:
+            QMessageBox.warning(self, "No Profile", "Please select or create a profile first.")
+            return
+        source = Path(self.src_input.text().strip())
+        dest_root = Path(self.dst_input.text().strip())
+        subj_name = self.subj_input.text().strip()
+        if not source.exists():
+            QMessageBox.warning(self, "Error", "Source folder not found.")
+            return
+        if not subj_name:
+            QMessageBox.warning(self, "Missing name", "Enter subject/project name.")
+            return
+        if self.plan_worker is not None and self.plan_worker.isRunning():
+            return
+
+        profile = self.current_profile
+        pass_name = profile.next_pass_name(subj_name) if profile.allow_subsubjects else None
+        subject = Subject(subj_name, str(dest_root), profile, pass_name)
+        recursive = self.recursive_checkbox.isChecked()
+        sniff = "unknown" if self.sniff_checkbox.isChecked() else None
+        sequences = self.sequences_checkbox.isChecked()
+        plan_key = (str(source), subj_name, str(dest_root), recursive, sniff, sequences)
+
+        self.plan_worker = PlanWorker(PipelineOrganizer(profile), source, subject, recursive, sniff, sequences,
+                                      self)
+        self.plan_worker.planned.connect(lambda plan: self.on_plan_ready(plan_key, plan))
+        self.plan_worker.error.connect(self.on_organize_error)
+        self.preview_btn.setEnabled(False)
+        self.plan_worker.finished.connect(lambda: self.preview_btn.setEnabled(True))
+        self.log_msg(f"Previewing '{source}'...")
+        self.plan_worker.start()
+
+    def on_plan_ready(self, plan_key, plan):
+        self.last_plan = (plan_key, plan)
+        self.log_msg(plan.describe())
+        for rel, sources in list(plan.collisions.items())[:20]:
+            self.log_msg(f"  collision {rel}: {', '.join(str(s) for s in sources)}")
+
+    def cancel_organize(self):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.cancel_btn.setEnabled(False)
+            self.log_msg("Cancelling after the files in flight...")
+
+    def on_organize_counted(self, total):
+        self.progress_bar.setRange(0, max(total, 1))
+        self.progress_bar.setValue(0)
+
+    def on_organize_progress(self, files, nbytes, elapsed):
+        self.progress_bar.setValue(min(files, self.progress_bar.maximum()))
+        if elapsed > 0:
+            self.throughput_label.setText(
+                f"{files} files | {files / elapsed:.1f} files/s | {nbytes / elapsed / 1e6:.1f} MB/s"
+            )
+
+    def on_organize_done(self, ok, failed):
+        for r in failed:
+            self.log_msg(f"Failed: {r.source} ({r.error})")
+        if self.worker.organizer.last_report is not None:
+            self.log_msg(self.worker.organizer.last_report.describe())
+        self.refresh_subjects_list()
+        if ok:
+            self.progress_bar.setValue(self.progress_bar.maximum())
+            self.log_msg("✅ Organization complete.")
+        elif self.worker.cancel_event.is_set():
+            self.log_msg("⏹ Organization cancelled.")
+        else:
+            self.log_msg("⚠️ Organization finished with issues.")
+
+    def on_organize_error(self, text):
+        self.log_msg(text)
+        QMessageBox.critical(self, "Error", text.strip().splitlines()[-1])
+
+    def on_worker_finished(self):
+        self.start_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+
+    def closeEvent(self, event):
+        # don't let Qt destroy a running QThread
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+        if self.plan_worker is not None and self.plan_worker.isRunning():
+            self.plan_worker.wait()
+        super().closeEvent(event)
+
+    def _format_counts(self, path, rescan):
+        folder = Path(path)
+        if not folder.exists():
+            return ""
+        categories = SubjectStats(folder).refresh(rescan=rescan)
+        files = sum(c["files"] for c in categories.values())
+        nbytes = sum(c["bytes"] for c in categories.values())
+        text = f" ({files} files, {nbytes / 1e6:.1f} MB)"
+        for category, totals in categories.items():
+            for pattern, ranges in totals.get("sequences", {}).items():
+                text += f"\n      ▸ {category}/{pattern}: {frame_count(ranges)} frames, {format_ranges(ranges)}"
+        return text
+
+    def show_summary(self, checked=False, rescan=False):
         try:
             if not self.current_profile:
                 QMessageBox.warning(self, "No profile", "Please select a profile first.")
                 return
             subjects = self.current_profile.list_subjects()
             summary_text = f"Profile: {self.current_profile.name}\n\nSubjects:\n"
+            # counts come from each pass folder's stats sidecar, not a full listing
             for subj, entry in subjects.items():
                 if self.current_profile.allow_subsubjects and isinstance(entry, dict):
                     summary_text += f"\n{subj}:\n"
                     for pass_name, path in entry.items():
-                        summary_text += f"  • {pass_name}: {path}\n"
+                        summary_text += f"  • {pass_name}: {path}{self._format_counts(path, rescan)}\n"
                 else:
-                    summary_text += f"\n{subj}: {entry}\n"
+                    summary_text += f"\n{subj}: {entry}{self._format_counts(entry, rescan)}\n"
             self.log_msg(summary_text)
         except Exception as e:
             self.log_msg(f"Error: {e}")
 
-
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     gui = PipelineGUI()
@@ -0,0 +1,60 @@
+"""Dedup store safety: later writes must never go through a hardlinked pass file.
+
+Run from the repo root:  python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from ContentStore import ContentStore  # noqa: E402
+from Manifest import file_digest  # noqa: E402
+from PipelineOrganizer import PipelineOrganizer  # noqa: E402
+from Profile import Profile  # noqa: E402
+from Subject import Subject  # noqa: E402
+
+
+class DedupOverwriteTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.source = self.root / "source"
+        self.source.mkdir()
+        self.dest = self.root / "projects"
+        self.profile = Profile("dedup_test", allow_subsubjects=True)
+        self.organizer = PipelineOrganizer(self.profile)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _subject(self, pass_name):
+        return Subject("shot010", self.dest, self.profile, pass_name)
+
+    def test_plain_rerun_does_not_write_through_dedup_links(self):
+        texture = self.source / "wall.png"
+        texture.write_bytes(b"original texture bytes")
+        pass1, pass2 = self._subject("pass001"), self._subject("pass002")
+        self.assertTrue(self.organizer.organize_to_subject(self.source, pass1, dedup=True))
+        self.assertTrue(self.organizer.organize_to_subject(self.source, pass2, dedup=True))
+        placed1 = pass1.destination_path / "Textures" / "wall.png"
+        placed2 = pass2.destination_path / "Textures" / "wall.png"
+        self.assertGreater(os.stat(placed2).st_nlink, 1)  # hardlinked (or reflinked) to the blob
+
+        texture.write_bytes(b"changed texture bytes, longer than before")
+        self.assertTrue(self.organizer.organize_to_subject(self.source, pass1))
+
+        self.assertEqual(placed1.read_bytes(), b"changed texture bytes, longer than before")
+        self.assertEqual(placed2.read_bytes(), b"original texture bytes")
+        store = ContentStore.for_subject(pass1)
+        blobs = [p for p in store.root.rglob("*") if p.is_file()]
+        self.assertEqual(len(blobs), 1)
+        self.assertEqual(file_digest(blobs[0]), blobs[0].name)
+        # no temp files are left behind
+        self.assertEqual(sorted(os.listdir(placed1.parent)), ["wall.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
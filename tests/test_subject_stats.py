@@ -0,0 +1,83 @@
+"""Stats sidecar accuracy: counts must follow the folder, not just the runs' deltas.
+
+Run from the repo root:  python -m pytest tests
+"""
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from PipelineOrganizer import PipelineOrganizer  # noqa: E402
+from Profile import Profile  # noqa: E402
+from Subject import Subject  # noqa: E402
+from SubjectStats import SubjectStats  # noqa: E402
+
+
+def tick():
+    # let folder mtimes move past the filesystem's timestamp granularity
+    time.sleep(0.05)
+
+
+class SubjectStatsTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.profile = Profile("stats_test", allow_subsubjects=True)
+        self.organizer = PipelineOrganizer(self.profile)
+        self.subject = Subject("shot010", self.root / "projects", self.profile, "pass001")
+        self.textures = self.subject.destination_path / "Textures"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _source(self, name, count):
+        folder = self.root / name
+        folder.mkdir()
+        for i in range(count):
+            (folder / f"{name}_{chr(97 + i)}.png").write_bytes(b"x" * (i + 1))
+        return folder
+
+    def _cached(self):
+        return SubjectStats(self.subject.destination_path).refresh(rescan=True)["Textures"]
+
+    def _actual(self):
+        files = [p for p in self.textures.iterdir() if p.is_file()]
+        return {"files": len(files), "bytes": sum(p.stat().st_size for p in files)}
+
+    def test_files_removed_by_hand_are_not_hidden_by_the_next_run(self):
+        self.assertTrue(self.organizer.organize_to_subject(self._source("first", 3), self.subject))
+        tick()
+        (self.textures / "first_a.png").unlink()
+        tick()
+        self.assertTrue(self.organizer.organize_to_subject(self._source("second", 1), self.subject))
+
+        cached = self._cached()
+        self.assertEqual({k: cached[k] for k in ("files", "bytes")}, self._actual())
+        self.assertEqual(cached["files"], 3)
+
+    def test_overlapping_runs_keep_each_others_files(self):
+        self.assertTrue(self.organizer.organize_to_subject(self._source("base", 2), self.subject))
+        tick()
+        inner_source = self._source("inner", 4)
+        inner = PipelineOrganizer(self.profile)
+        started = []
+
+        def run_inner(result):
+            # a second run into the same pass starts and finishes while this one is still going
+            if not started:
+                started.append(result)
+                self.assertTrue(inner.organize_to_subject(inner_source, self.subject))
+
+        self.assertTrue(self.organizer.organize_to_subject(self._source("outer", 3), self.subject,
+                                                           progress=run_inner))
+
+        cached = self._cached()
+        self.assertEqual({k: cached[k] for k in ("files", "bytes")}, self._actual())
+        self.assertEqual(cached["files"], 9)
+
+
+if __name__ == "__main__":
+    unittest.main()